@@ -9,6 +9,13 @@ import aqt
 from aqt import mw, gui_hooks
 from aqt.qt import *
 from aqt.utils import showInfo, tooltip, getOnlyText
+from .realm import bitset, fog, serializers, worldcache
+from .realm.chunks import chunk_of
+from .realm.storage import get_store, flush_all
+from .realm.sqlstore import get_sqlite_store, SQLITE_SAVE_NAME
+from .realm.world import PALETTE, TERRAIN_CONFIG, WorldMap, SavedWorld
+from .realm.schema import migrate
+from .realm.review import apply_review, complete_ruin, restore_memory, RUIN_REVIEWS, WAGER_REVIEWS, SANDSTORM_REVIEWS, RESTORE_ALL
 
 # ==========================================
 # 1. CONFIGURATION
@@ -19,8 +26,6 @@ DEBUG_MODE = True
 SERVER_URL = "https://jerryshen100.pythonanywhere.com"
 
 # --- GAME CONSTANTS ---
-BASE_MAP_SIZE = 350       
-LEVEL_GROWTH = 50         
 STARTING_RADIUS = 0 
 VISION_RANGE_DEFAULT = 2  
 
@@ -32,48 +37,8 @@ COLOR_TEXT_MAIN = "#2d3436"
 COLOR_PRIMARY = "#0984e3"
 COLOR_ACCENT = "#f1c40f" # Sunflower Yellow
 COLOR_CANCEL = "#e17055" # Soft Red for Cancel button
-
-PALETTE = {
-    "plains":   "#8bc34a", 
-    "hills":    "#cddc39", 
-    "forest":   "#2d5a27", 
-    "dunes":    "#ffd54f", 
-    "swamp":    "#5d4037", 
-    "lake":     "#2980b9", 
-    "scrub":    "#8c9e5e", 
-    "ruins":    "#8e44ad", # Changed to purple for distinction
-    "tundra":   "#b2ebf2", 
-    "wasteland":"#2d3436", 
-    "volcanic": "#d84315", 
-    "mountain": "#95a5a6", 
-    "wall":     "#2d3436", 
-    "start":    "#55efc4", 
-    "exit":     "#f1c40f", 
-    "trap":     "#e74c3c",
-    "key":      "#00d2d3", 
-    "p0_hex":   "#0984e3", 
-    "p1_hex":   "#9b59b6", 
-}
-
-TERRAIN_CONFIG = {
-    "plains": {"cost": 20, "color": PALETTE["plains"], "name": "Plains", "desc": "Standard open terrain. Low movement cost with clear visibility."},
-    "hills": {"cost": 40, "color": PALETTE["hills"], "name": "Hills", "desc": "Uneven ground. Slightly higher coin cost to traverse."},
-    "forest": {"cost": 50, "color": PALETTE["forest"], "name": "Forest", "desc": "Dense canopy. Limits visibility over forest tiles and limits visibility to 1 while within."},
-    "dunes": {"cost": 40, "color": PALETTE["dunes"], "name": "Dunes", "desc": "Shifting sands. Causes Blindness: You forget your map. 300 Reviews to clear the sand from your eyes."},
-    "swamp": {"cost": 50, "color": PALETTE["swamp"], "name": "Bog", "desc": "Treacherous mud. 20% chance to sink and lose 50% of your current coins."},
-    "lake": {"cost": 0, "color": PALETTE["lake"], "name": "Lake", "desc": "Deep water. Impassable barrier that must be navigated around."}, 
-    "scrub": {"cost": 60, "color": PALETTE["scrub"], "name": "Scrub", "desc": "Dense, thorny brush. High movement cost that can be decreased by doing reviews quickly."},
-    "ruins": {"cost": 0, "color": PALETTE["ruins"], "name": "Ancient Ruins", "desc": "Mysterious structures. Study 500 cards here to reveal the location of a Key or the Artifact."},
-    "mountain": {"cost": 0, "color": PALETTE["mountain"], "name": "Mountain", "desc": "Blocks normal movement. Spend 100 reviews to Climb for massive vision."},
-    "tundra": {"cost": 100, "color": PALETTE["tundra"], "name": "Tundra", "desc": "Freezing winds. 33% chance to Freeze (Debt: 150 Speedy Reviews < 5s/card)."},
-    "wasteland":{"cost": 100, "color": PALETTE["wasteland"], "name": "Jagged Peaks", "desc": "Unstable cliffs. 33% chance of Rockslide (Debt: Achieve 100 Consistent High Quality Reviews)."},
-    "volcanic": {"cost": 100, "color": PALETTE["volcanic"], "name": "Volcanic", "desc": "Active magma. 33% chance to Burn (Debt: 200 Reviews)."},
-    "trap": {"cost": 0, "color": PALETTE["trap"], "name": "Trap", "desc": "Hidden mine. Stepping on an enemy trap triggers a 100 Review Lockdown."},
-    "wall": {"cost": 0, "color": PALETTE["wall"], "name": "Bedrock", "desc": "Indestructible solid rock barrier."},
-    "start": {"cost": 0, "color": PALETTE["start"], "name": "Base", "desc": "Your safe zone. Use the 'Recall' item to return here instantly."},
-    "exit": {"cost": 0, "color": PALETTE["exit"], "name": "Artifact", "desc": "The Objective. The first player to reach this Golden Tile wins the match."},
-    "key": {"cost": 0, "color": PALETTE["key"], "name": "Key", "desc": "Ancient Mechanism. Required to unlock the Artifact."}
-}
+SQRT3 = math.sqrt(3)
+HEX_CORNERS = tuple((math.cos(math.radians(60 * i)), math.sin(math.radians(60 * i))) for i in range(6))  # Unit flat-top hexagon
 
 STYLE_BUTTON_CSS = f"""
     QPushButton {{ 
@@ -115,229 +80,106 @@ class StatEngine:
     def get_today_stats():
         return {"volume": 100, "retention": 85.0, "new_count": 10, "avg_time": 5.0}
 
-class Tile:
-    def __init__(self, q, r):
-        self.q = q; self.r = r; self.type = "plains"; self.cost = 20
-        self.visible = False; self.visited = False; self.is_locked = False
-        self.trap_owner = None; self.variant = random.randint(0, 100)
-        self.trap_group_id = None 
-
-    def to_dict(self):
-        d = {
-            "q": self.q, "r": self.r, "type": self.type, "cost": self.cost,
-            "visible": self.visible, "visited": self.visited,
-            "is_locked": self.is_locked, "trap_owner": self.trap_owner,
-            "variant": self.variant
-        }
-        if self.trap_group_id: d["trap_group_id"] = self.trap_group_id
-        return d
-
-    @classmethod
-    def from_dict(cls, d):
-        t = cls(d["q"], d["r"]); t.type = d["type"]; t.cost = d["cost"]
-        t.visible = d.get("visible", False)
-        t.visited = d.get("visited", False)
-        t.is_locked = d.get("is_locked", False)
-        t.trap_owner = d.get("trap_owner")
-        t.variant = d.get("variant", 0)
-        t.trap_group_id = d.get("trap_group_id")
-        return t
-
-
-
-class WorldMap:
-    def __init__(self, radius, level=1, generate=True, seed=None):
-        self.radius = 0; self.level = level; self.tiles = {}; self.start_pos = (0, 0); self.exit_pos = None
-        self.seed = seed if seed else random.randint(100000, 999999)
-        if generate: self.generate_world()
-    def to_dict(self):
-        return {"radius": self.radius, "level": self.level, "start_pos": list(self.start_pos), "exit_pos": list(self.exit_pos), "seed": self.seed, "tiles": {f"{c[0]},{c[1]}": t.to_dict() for c, t in self.tiles.items()}}
-    @classmethod
-    def from_dict(cls, d):
-        w = cls(0, d["level"], False); w.radius = d["radius"]; w.start_pos = tuple(d["start_pos"]); w.exit_pos = tuple(d["exit_pos"]); w.seed = d.get("seed")
-        for k, v in d["tiles"].items(): q, r = map(int, k.split(',')); w.tiles[(q, r)] = Tile.from_dict(v)
-        return w
-    def get_neighbors(self, q, r): return [(q+dq, r+dr) for dq, dr in [(1,0),(1,-1),(0,-1),(-1,0),(-1,1),(0,1)]]
-    def hex_dist(self, a, b): return (abs(a[0]-b[0]) + abs(a[1]-b[1]) + abs(a[0]+a[1]-b[0]-b[1])) / 2
-    
-    def generate_world(self):
-        random.seed(self.seed) 
-        target_size = BASE_MAP_SIZE + (self.level * LEVEL_GROWTH)
-        self.tiles = {}; self.tiles[(0,0)] = Tile(0,0)
-        current_layer = [(0,0)]
-        while len(self.tiles) < target_size:
-            next_layer = set()
-            for curr in current_layer:
-                for n in self.get_neighbors(*curr):
-                    if n not in self.tiles: next_layer.add(n)
-            if not next_layer: break
-            candidates = list(next_layer); random.shuffle(candidates)
-            take_count = max(1, int(len(candidates) * 0.85)) if len(self.tiles) > 20 else len(candidates)
-            added = []
-            for i in range(min(take_count, target_size - len(self.tiles))):
-                c = candidates[i]; self.tiles[c] = Tile(c[0], c[1]); added.append(c)
-            current_layer = added
-
-        keys = list(self.tiles.keys())
-        for _ in range(3): 
-            new_tiles = {}
-            for c in keys:
-                for n in self.get_neighbors(*c):
-                    if n not in self.tiles and n not in new_tiles:
-                        neighbor_count = sum(1 for nn in self.get_neighbors(*n) if nn in self.tiles)
-                        if neighbor_count >= 4: new_tiles[n] = Tile(n[0], n[1])
-            if not new_tiles: break
-            self.tiles.update(new_tiles); keys.extend(new_tiles.keys())
-
-        max_dist = 0
-        for c in self.tiles:
-            d = self.hex_dist((0,0), c)
-            if d > max_dist: max_dist = d
-        self.radius = int(max_dist) + 1
-
-        rot = random.uniform(0, 2*math.pi)
-        for c, t in self.tiles.items():
-            dist = self.hex_dist((0,0), c)
-            if dist <= 3: t.type = random.choice(["plains", "plains", "hills"])
-            elif dist <= (self.radius * 0.4):
-                if random.random() > 0.94: t.type = "mountain"
-                else: t.type = random.choice(["hills", "plains", "forest"]) 
-            else:
-                angle = math.atan2(math.sqrt(3)/2*c[0] + math.sqrt(3)*c[1], 3/2*c[0]) + rot
-                if angle < 0: angle += 2*math.pi
-                sector = int((angle / (2*math.pi)) * 3) % 3
-                moisture = math.sin((c[0]) * 0.25) + math.cos((c[1]) * 0.25)
-                if dist > (self.radius * 0.55):
-                    if moisture > 0: t.type = random.choice(["tundra", "tundra", "wasteland"])
-                    else: t.type = random.choice(["volcanic", "wasteland", "mountain"])
-                else:
-                    if moisture > 0.8: t.type = "lake" 
-                    elif moisture > 0.2: t.type = random.choice(["swamp", "swamp", "swamp", "plains"])
-                    elif moisture < -0.5: t.type = random.choice(["dunes", "scrub", "dunes"])
-                    else: t.type = random.choice(["plains", "hills", "scrub", "mountain"])
-            t.cost = TERRAIN_CONFIG[t.type]["cost"]
-        
-        # --- RUIN GENERATION (Update) ---
-        # Very rare, middle distance (4-9), isolated
-        ruin_locs = []
-        for c, t in self.tiles.items():
-            dist = self.hex_dist((0,0), c)
-            
-            # 1. Distance Check: Middle Band
-            if 4 <= dist <= 9 and t.type not in ["lake", "mountain", "start", "exit"]:
-                # 2. Rarity Check: 1.5% chance (0.015)
-                if random.random() < 0.015: 
-                    
-                    # 3. Isolation Check: Ensure no other ruins are neighbors
-                    # We check distance to existing ruins. If dist <= 2, they are neighbors/too close.
-                    too_close = False
-                    for r_loc in ruin_locs:
-                        if self.hex_dist(c, r_loc) <= 4: 
-                             too_close = True
-                             break
-                    
-                    if not too_close:
-                        t.type = "ruins"
-                        t.cost = 0 # Studying is free (currency-wise)
-                        ruin_locs.append(c)
-
-        self.start_pos = (0,0); self.tiles[self.start_pos].type = "start"; self.tiles[self.start_pos].cost = 0
-        all_coords = list(self.tiles.keys())
-        hard_tiles = [c for c in all_coords if self.tiles[c].type in ["tundra", "wasteland", "volcanic"] and self.hex_dist((0,0), c) > self.radius * 0.6]
-        self.exit_pos = random.choice(hard_tiles) if hard_tiles else max(all_coords, key=lambda c: self.hex_dist((0,0), c))
-        
-        self.tiles[self.exit_pos].type = "exit"
-        self.tiles[self.exit_pos].cost = 0
-        
-        self.generate_forest_clusters(); self.generate_lakes(); self.generate_keys()
-
-    def generate_forest_clusters(self):
-        valid = [c for c in self.tiles.keys() if self.hex_dist((0,0), c) > 2 and c != self.start_pos and c != self.exit_pos and self.tiles[c].type not in ["mountain", "volcanic", "tundra", "wasteland", "ruins"]]
-        count = random.randint(4, 7) 
-        for _ in range(count):
-            if not valid: break
-            seed = random.choice(valid); blob_size = random.randint(6, 12); cluster = {seed}; attempts = 0
-            while len(cluster) < blob_size and attempts < 30:
-                attempts += 1; source = random.choice(list(cluster)); neighbors = self.get_neighbors(*source); random.shuffle(neighbors)
-                for n in neighbors:
-                    if n in self.tiles and n not in cluster and n != self.start_pos and n != self.exit_pos and self.tiles[n].type in ["plains", "hills", "scrub"]:
-                        cluster.add(n); break
-            for c in cluster:
-                self.tiles[c].type = "forest"; self.tiles[c].cost = TERRAIN_CONFIG["forest"]["cost"]
-                if c in valid: valid.remove(c)
-
-    def generate_lakes(self):
-        valid = [c for c in self.tiles.keys() if self.hex_dist((0,0), c) < self.radius - 1 and c != self.start_pos and c != self.exit_pos and self.tiles[c].type != "ruins"]
-        count = random.randint(3, 5)
-        for _ in range(count):
-            if not valid: break
-            seed = random.choice(valid); blob_size = random.randint(4, 9); lake_cluster = {seed}; attempts = 0
-            while len(lake_cluster) < blob_size and attempts < 20:
-                attempts += 1; source = random.choice(list(lake_cluster)); neighbors = self.get_neighbors(*source); random.shuffle(neighbors)
-                for n in neighbors:
-                    if n in self.tiles and n not in lake_cluster and n != self.start_pos and n != self.exit_pos:
-                        lake_cluster.add(n); break 
-            for c in lake_cluster:
-                self.tiles[c].type = "lake"; self.tiles[c].cost = 0
-                if c in valid: valid.remove(c)
-
-    def generate_keys(self):
-        candidates = []
-        min_dist_from_exit = self.radius * 0.55
-        
-        valid_coords = [c for c in self.tiles.keys() if c != self.start_pos and c != self.exit_pos and self.tiles[c].type not in ["wall", "lake", "ruins"]]
-        
-        for c in valid_coords:
-            if self.hex_dist(c, self.exit_pos) > min_dist_from_exit:
-                candidates.append(c)
-        
-        if not candidates: candidates = valid_coords 
-
-        key1 = random.choice(candidates)
-        self.tiles[key1].type = "key"
-        self.tiles[key1].cost = 0
-        
-        candidates_for_2 = [c for c in candidates if c != key1 and self.hex_dist(c, key1) > (self.radius * 0.4)]
-        if not candidates_for_2: candidates_for_2 = [c for c in candidates if c != key1] 
-        
-        if candidates_for_2:
-            key2 = random.choice(candidates_for_2)
-            self.tiles[key2].type = "key"
-            self.tiles[key2].cost = 0
-
 # ==========================================
 # 3. FILE I/O & ID MANAGEMENT
 # ==========================================
 
+# Generated terrain, shared by every profile (worlds are a pure function of seed/level; see realm/worldcache.py)
+WORLD_CACHE_DIR = os.path.join(os.path.dirname(__file__), "world_cache")
+
+def configure_world_cache():
+    config = mw.addonManager.getConfig(__name__) or {}
+    worldcache.configure(WORLD_CACHE_DIR, int(config.get("world_cache_mb", 32) * 1024 * 1024))
+
+configure_world_cache()
+
+_save_paths = {}  # profile name -> save path
+_save_stores = {} # profile name -> store (JSON journal or SQLite, per the add-on config)
+_uids = {}        # save path -> uid
+
 def get_save_path(): 
     profile_name = mw.pm.name
-    safe_name = "".join([c for c in profile_name if c.isalnum()])
-    filename = f"lumina_save_{safe_name}.json"
-    return os.path.join(os.path.dirname(__file__), filename)
+    path = _save_paths.get(profile_name)
+    if path is None:
+        safe_name = "".join([c for c in profile_name if c.isalnum()])
+        filename = f"lumina_save_{safe_name}.json"
+        path = _save_paths[profile_name] = os.path.join(os.path.dirname(__file__), filename)
+    return path
+
+def get_save_store():
+    profile_name = mw.pm.name
+    store = _save_stores.get(profile_name)
+    if store is None:
+        path = get_save_path()
+        config = mw.addonManager.getConfig(__name__) or {}
+        serializers.configure(config.get("save_codec"), config.get("compress_saves", False))
+        if config.get("save_backend") == "sqlite":
+            # Lives in the profile folder; the JSON save is imported on first open (see realm/sqlstore.py)
+            store = get_sqlite_store(os.path.join(mw.pm.profileFolder(), SQLITE_SAVE_NAME), legacy_path=path)
+        else: store = get_store(path)
+        _save_stores[profile_name] = store
+    return store
 
 def load_game_data():
-    path = get_save_path()
     try: 
-        data = json.load(open(path, "r"))
+        # Base snapshot + replayed journal (see realm/storage.py), or the SQLite rows
+        data = get_save_store().load()
         if "uid" not in data: return None
+        # Legacy shapes are upgraded once here (see realm/schema.py); the
+        # upgraded save is queued so the next load skips straight past this
+        if migrate(data): save_game_data(data)
         return data
     except: return None
 
 def save_game_data(data):
-    path = get_save_path()
-    try: json.dump(data, open(path, "w"), indent=2)
+    # Queued for the background writer, which writes only the changed fields/tiles
+    try: get_save_store().save(data)
+    except Exception as e: print(f"Realm Save Error: {e}")
+
+def flush_game_data():
+    get_save_store().flush()
+
+def delete_game_data():
+    _uids.pop(get_save_path(), None)
+    get_save_store().delete()
+
+def record_match_result(seed, result):
+    try: get_save_store().record_match(seed, result)
     except Exception as e: print(f"Realm Save Error: {e}")
 
 def get_uid():
+    # The uid never changes once written, so only the first call per profile touches the save
+    path = get_save_path()
+    if path in _uids: return _uids[path]
     d = load_game_data()
     if not d or "uid" not in d:
         u = str(uuid.uuid4())
         if not d: d = {"username": f"Explorer {u[:4]}", "category": "Other"}
-        d["uid"] = u
+        d["uid"] = u; migrate(d)
         save_game_data(d)
-        return u
+    _uids[path] = d["uid"]
     return d["uid"]
 
+# --- CHANGE NOTIFICATION ---
+# The review hook publishes exactly what it changed so an open RealmDialog can
+# apply it directly instead of polling and reparsing the save file.
+class StateEvents(QObject):
+    # (version, {"fields": {key: new value}, "tiles": [[q, r, visible, visited], ...]})
+    changed = pyqtSignal(int, dict)
+
+state_events = StateEvents()
+_state_version = 0
+
+def snapshot_fields(d): return {k: json.dumps(v) for k, v in d.items() if k != "world"}
+
+def publish_state_change(d, before, world=None):
+    global _state_version
+    fields = {k: v for k, v in d.items() if k != "world" and before.get(k) != json.dumps(v)}
+    tiles = [[*world.coords[i], world.get("visible", i), world.get("visited", i)] for i in sorted(world.touched)] if world else []
+    if not fields and not tiles: return
+    _state_version += 1
+    state_events.changed.emit(_state_version, {"fields": fields, "tiles": tiles})
+
 def get_all_traps():
     traps = {} 
     return traps
@@ -346,7 +188,7 @@ def update_currency(amt):
     d = load_game_data()
     if not d: return
     if "world" not in d: return
-    d["currency"] = d.get("currency", 0) + amt
+    d["currency"] += amt
     save_game_data(d)
     return d["currency"]
 
@@ -355,180 +197,32 @@ def generate_pills_html(d):
     def make_pill(icon, text, bg):
         return (f"""<div style='background:{bg}; color:white; padding:2px 8px; border-radius:10px; font-size:10px; font-weight:800; margin-left:6px; display:inline-flex; align-items:center; box-shadow:0 1px 3px rgba(0,0,0,0.3); border:1px solid rgba(255,255,255,0.2); font-family:sans-serif;'>{icon} {text}</div>""")
     
-    if d.get("wager_active"): pills += make_pill("🎲", f"{d.get('wager_progress',0)}/200", "#9b59b6")
-    if d.get("ruin_active"): pills += make_pill("🏛", f"{d.get('ruin_progress',0)}/500", "#8e44ad")
-    if d.get("freeze_debt", 0) > 0: pills += make_pill("❄", f"{d['freeze_debt']}", "#0984e3")
-    if d.get("trap_debt", 0) > 0: pills += make_pill("⚠", f"{d['trap_debt']}", "#d63031")
-    if d.get("rock_debt", 0) > 0: pills += make_pill("⛰", f"{d['rock_debt']}", "#2d3436")
-    if d.get("burn_debt", 0) > 0: pills += make_pill("🔥", f"{d['burn_debt']}", "#d35400")
-    if d.get("climb_debt", 0) > 0: pills += make_pill("▲", f"{d['climb_debt']}", "#f1c40f")
-    if d.get("disorientation_debt", 0) > 0: pills += make_pill("≋", f"{d['disorientation_debt']}", "#fab1a0")
+    if d["wager_active"]: pills += make_pill("🎲", f"{d['wager_progress']}/{WAGER_REVIEWS}", "#9b59b6")
+    if d["ruin_active"]: pills += make_pill("🏛", f"{d['ruin_progress']}/{RUIN_REVIEWS}", "#8e44ad")
+    if d["freeze_debt"] > 0: pills += make_pill("❄", f"{d['freeze_debt']}", "#0984e3")
+    if d["trap_debt"] > 0: pills += make_pill("⚠", f"{d['trap_debt']}", "#d63031")
+    if d["rock_debt"] > 0: pills += make_pill("⛰", f"{d['rock_debt']}", "#2d3436")
+    if d["burn_debt"] > 0: pills += make_pill("🔥", f"{d['burn_debt']}", "#d35400")
+    if d["climb_debt"] > 0: pills += make_pill("▲", f"{d['climb_debt']}", "#f1c40f")
+    if d["disorientation_debt"] > 0: pills += make_pill("≋", f"{d['disorientation_debt']}", "#fab1a0")
     return pills
 
 def on_card_answered(reviewer, card, ease):
     d = load_game_data()
     if not d or "world" not in d: return
+    before = snapshot_fields(d)
 
-    # --- 1. CURRENCY ---
-    if ease > 1:
-        d["currency"] = d.get("currency", 0) + 5
-
-    # --- 2. ARCHIVE / RUIN LOGIC (Multi-Ping Support) ---
-    if d.get("ruin_active"):
-        d["ruin_progress"] = d.get("ruin_progress", 0) + 1
-        
-        if d["ruin_progress"] >= 500:
-            d["ruin_active"] = False
-            d["ruin_progress"] = 0
-            
-            # Mark Ruin Complete
-            curr_loc = d.get("current_ruin_location")
-            if curr_loc:
-                completed = d.get("completed_ruins", [])
-                if curr_loc not in completed: completed.append(curr_loc)
-                d["completed_ruins"] = completed
-                d["current_ruin_location"] = None
-
-            # Multi-Ping Radar Logic
-            tiles_dict = d.get("world", {}).get("tiles", {})
-            current_pings = d.get("radar_targets", [])
-            possible_pings = []
-            
-            for k, v in tiles_dict.items():
-                # FIX: Use 'visited' to ignore keys we found but walked away from
-                if v.get("type") in ["key", "exit"] and not v.get("visited", False):
-                    if k not in current_pings: possible_pings.append(k)
-            
-            if possible_pings:
-                new_target = str(random.choice(possible_pings))
-                current_pings.append(new_target)
-                d["radar_targets"] = current_pings
-                tooltip(f"Archive Deciphered! New signal at {new_target}.", period=4000)
-            else:
-                # If everything is visited/pinged, give a refund or empty message
-                tooltip("Archive Deciphered! No unknown signals remain.", period=4000)
-        else:
-            if d["ruin_progress"] % 50 == 0:
-                tooltip(f"Archive Progress: {d['ruin_progress']}/500")
-
-    # --- 3. WAGER LOGIC ---
-    if d.get("wager_active", False):
-        d["wager_progress"] = d.get("wager_progress", 0) + 1
-        if ease > 1: d["wager_correct"] = d.get("wager_correct", 0) + 1
-        
-        prog = d["wager_progress"]
-        if prog >= 200:
-            retention = (d["wager_correct"] / 200.0) * 100.0
-            if retention >= 90.0:
-                d["currency"] += 500 
-                tooltip(f"WAGER WON! {retention:.1f}% (+500 Coins)", period=5000)
-            else:
-                tooltip(f"WAGER LOST. {retention:.1f}%", period=5000)
-            d["wager_active"] = False; d["wager_progress"] = 0; d["wager_correct"] = 0
-
-    # --- 4. DEBT REDUCTION (Now clears Flags Immediately) ---
-    
-    # Freeze (Requires answering quickly < 5s)
-    if d.get("freeze_debt", 0) > 0:
-        time_ms = reviewer.card.time_taken()
-        if time_ms < 5000: 
-            d["freeze_debt"] -= 1
-            if d["freeze_debt"] <= 0: 
-                d["freeze_debt"] = 0
-                d["is_frozen"] = False # Clear flag immediately
-                tooltip("Thawed! You can move again.")
-    
-    # Trap
-    if d.get("trap_debt", 0) > 0: 
-        d["trap_debt"] -= 1
-        if d["trap_debt"] <= 0:
-            d["trap_debt"] = 0
-            d["is_trapped"] = False
-            tooltip("Trap disabled.")
-
-    # Climb
-    if d.get("climb_debt", 0) > 0: 
-        d["climb_debt"] -= 1
-        if d["climb_debt"] <= 0:
-            d["climb_debt"] = 0
-            d["is_climbing"] = False
-            tooltip("Summit reached.")
-
-    # Burn
-    if d.get("burn_debt", 0) > 0: 
-        d["burn_debt"] -= 1
-        if d["burn_debt"] <= 0:
-            d["burn_debt"] = 0
-            d["is_burned"] = False
-            tooltip("Flames extinguished.")
-    
-    # Rockslide (Quality Check)
-    if d.get("rock_debt", 0) > 0:
-        if ease >= 2: 
-            d["rock_debt"] -= 1
-            if d["rock_debt"] <= 0: 
-                d["rock_debt"] = 0
-                d["is_buried"] = False
-                tooltip("Dug out! Path is clear.")
-        else:
-            d["rock_debt"] += 5
-            tooltip("Mistake! Rocks slide back (+5)")
-
-    # --- 5. SANDSTONE / DISORIENTATION FIX ---
-    if d.get("disorientation_debt", 0) > 0:
-        d["disorientation_debt"] -= 1
-        
-        lost_mem = d.get("lost_memory")
-        if lost_mem:
-            # Determine how many to restore
-            if d["disorientation_debt"] <= 0: 
-                count_to_restore = 999999 # Restore ALL
-            else: 
-                # Proportional restore: if debt is 300 and we have 300 tiles, restore 1 per click.
-                # Use length of memory to estimate.
-                total_mem = len(lost_mem) if isinstance(lost_mem, list) else len(lost_mem.keys())
-                count_to_restore = math.ceil(total_mem / max(1, d["disorientation_debt"]))
-                count_to_restore = max(1, count_to_restore)
-
-            # Handle Dict
-            if isinstance(lost_mem, dict):
-                keys = list(lost_mem.keys())
-                world_tiles = d.get("world", {}).get("tiles", {})
-                
-                for _ in range(min(len(keys), int(count_to_restore))):
-                    k = keys.pop(0)
-                    state = lost_mem.pop(k)
-                    if k in world_tiles:
-                        world_tiles[k]["visible"] = state.get("vis", False)
-                        world_tiles[k]["visited"] = state.get("vst", False)
-                
-                d["lost_memory"] = lost_mem
-                d["world"]["tiles"] = world_tiles
-                
-            # Handle List (Legacy)
-            elif isinstance(lost_mem, list):
-                restored = []
-                for _ in range(min(len(lost_mem), int(count_to_restore))):
-                    restored.append(lost_mem.pop(0))
-                
-                world_tiles = d.get("world", {}).get("tiles", {})
-                for c_str in restored:
-                    if c_str in world_tiles: world_tiles[c_str]["visited"] = True
-                
-                d["lost_memory"] = lost_mem
-                d["world"]["tiles"] = world_tiles
-
-        if d["disorientation_debt"] <= 0: 
-            d["disorientation_debt"] = 0
-            d["is_disoriented"] = False
-            tooltip("Vision fully restored!")
-
-    # -----------------------------------------
+    # Game effects live in realm/review.py; the hook only shows what they report
+    notes, world = apply_review(d, ease, reviewer.card.time_taken)
+    for msg, period in notes:
+        if period: tooltip(msg, period=period)
+        else: tooltip(msg)
 
     save_game_data(d)
+    publish_state_change(d, before, world)
 
     if mw.reviewer.web:
-        new_coins = d.get('currency', 0)
+        new_coins = d['currency']
         new_pills = generate_pills_html(d).replace("'", "\\'")
         js = f"""
         var c = document.getElementById('realm-coins');
@@ -539,6 +233,8 @@ def on_card_answered(reviewer, card, ease):
         mw.reviewer.web.eval(js)
 
 gui_hooks.reviewer_did_answer_card.append(on_card_answered)
+# Don't let queued saves die with the profile (or the app)
+gui_hooks.profile_will_close.append(flush_all)
 
 # ==========================================
 # 4. NETWORK MANAGER
@@ -649,6 +345,38 @@ class NetworkWorker(QObject):
             except: pass
         threading.Thread(target=_task, daemon=True).start()
 
+class WorldLoader(QObject):
+    """
+    Builds match worlds on a worker thread (generation runs on the world's own
+    RNG, so it is safe off the UI thread). world_ready is delivered on the UI
+    thread; take() hands the built world over once.
+    """
+    world_ready = pyqtSignal(int, object)  # (seed, WorldMap or None on failure)
+
+    def __init__(self):
+        super().__init__()
+        self.worlds = {}; self.pending = set()
+        self.world_ready.connect(self._store)
+
+    def has(self, seed): return seed in self.worlds
+
+    def prefetch(self, seed, level=1):
+        if seed in self.worlds or seed in self.pending: return
+        self.pending.add(seed)
+        def _task():
+            # Also warms static_layer and the disk cache, so a saved world for this seed decodes instantly
+            try: world = WorldMap.from_seed(seed, level)
+            except Exception as e: print(f"Realm: could not build world {seed}: {e}"); world = None
+            self.world_ready.emit(seed, world)
+        threading.Thread(target=_task, daemon=True).start()
+
+    def _store(self, seed, world):
+        # Connected first, so every other world_ready slot already sees the world in self.worlds
+        self.pending.discard(seed)
+        if world is not None: self.worlds = {seed: world}  # Only the latest match is worth keeping
+
+    def take(self, seed): return self.worlds.pop(seed, None)
+
 # ==========================================
 # 5. UI COMPONENTS
 # ==========================================
@@ -1144,14 +872,17 @@ class HexMapWidget(QWidget):
         self.cold_stacks = 0; self.is_frozen = False; self.freeze_debt = 0
         self.is_trapped = False; self.trap_debt = 0; self.is_buried = False; self.rock_debt = 0
         self.is_climbing = False; self.climb_debt = 0; self.is_burned = False; self.burn_debt = 0 
-        self.is_disoriented = False; self.disorientation_debt = 0; self.lost_memory = []
+        self.is_disoriented = False; self.disorientation_debt = 0; self.lost_memory = {}
+        self.fog_key = None  # What the last fog pass saw from; None forces the next one
+        self.chunk_members = None; self.render_cache = {}; self.render_frame = None  # Cached terrain chunks (see paint_terrain)
+        self.grid_key = None; self.hex_path = None; self.centers = []; self.origin = (0.0, 0.0)  # Cached hex geometry (see update_grid_metrics)
         
         # Ruin State
         self.ruin_active = False 
         self.ruin_progress = 0
         self.current_ruin_location = None  # Tracks which tile we are studying
         self.completed_ruins = []          # Tracks tiles we finished
-        self.radar_target = None           # Tracks the ping coordinate
+        self.radar_targets = []            # Tracks the ping coordinates ("q,r")
         
         self.has_key = False
         self.wager_active = False; self.wager_progress = 0; self.wager_total = 200
@@ -1168,61 +899,32 @@ class HexMapWidget(QWidget):
                 self.active_ping = None
         self.update()
     def update_grid_metrics(self):
-        w = self.width(); h = self.height(); R = self.world.radius
-        self.hex_r = min((w * 0.98) / (3.0 * R + 2.0), (h * 0.98) / (math.sqrt(3) * (2.0 * R + 1.0)))
+        # Hex size, the hexagon outline and every tile id's center: rebuilt only when the widget is resized
+        # or the map grows (a new topology), so paint and click handlers just compare the key
+        w = self.width(); h = self.height(); R = self.world.radius; topo = self.world.topology
+        key = (w, h, R, topo)
+        if key == self.grid_key: return
+        self.grid_key = key; self.origin = (w / 2, h / 2)
+        self.hex_r = r = min((w * 0.98) / (3.0 * R + 2.0), (h * 0.98) / (SQRT3 * (2.0 * R + 1.0)))
+        path = QPainterPath(QPointF(r * HEX_CORNERS[0][0], r * HEX_CORNERS[0][1]))
+        for x, y in HEX_CORNERS[1:]: path.lineTo(r * x, r * y)
+        path.closeSubpath(); self.hex_path = path
+        self.centers = [self.get_hex_center(q, rr) for q, rr in topo.coords]
+    def resizeEvent(self, e):
+        super().resizeEvent(e); self.update_grid_metrics()
     def update_fog_of_war(self):
-        # 1. RESET ACTIVE SIGHT
-        # We must turn off 'visible' for the whole map first. 
         # 'Visited' remains True forever, but 'visible' is only for what you see NOW.
-        for t in self.world.tiles.values():
-            t.visible = False
-
-        # 2. Initialize BFS
-        vis = {self.player_pos}
-        queue = [(self.player_pos, 0)]
-        
-        # Current tile is always Bright & Visited
-        self.world.tiles[self.player_pos].visible = True
-        self.world.tiles[self.player_pos].visited = True
-        
-        # 3. Determine Vision Range
-        limit = 2  # Standard
-        current_type = self.world.tiles[self.player_pos].type
-        
+        here = self.world.tiles[self.player_pos]
         # Mountain Bonus: Only Range 5 if debt is PAID
-        is_on_summit = (current_type == "mountain" and self.climb_debt == 0)
-        
-        if is_on_summit:
-            limit = 5
-        elif current_type == "forest":
-            limit = 1
-
-        # 4. Determine Blockers
-        blockers = ["wall"]
-        if not is_on_summit:
-            blockers.append("forest")
-            blockers.append("lake")
-
-        # 5. BFS Loop
-        while queue:
-            curr, dist = queue.pop(0)
-            
-            if curr != self.player_pos:
-                 if self.world.tiles[curr].type in blockers:
-                     continue
-            
-            if dist < limit:
-                for n in self.world.get_neighbors(*curr):
-                    if n in self.world.tiles and n not in vis:
-                        vis.add(n)
-                        
-                        # Sandstorm Safety
-                        new_dist = dist + 1
-                        if not self.is_disoriented or new_dist <= 1:
-                            self.world.tiles[n].visible = True
-                            self.world.tiles[n].visited = True
-                            queue.append((n, new_dist))
-                        
+        is_on_summit = (here.type == "mountain" and self.climb_debt == 0)
+        key = (self.player_pos, is_on_summit, self.is_disoriented)
+        if key == self.fog_key: return  # Nothing that decides sight changed
+
+        # Bitsets over tile ids: memoized footprint, then two int operations
+        self.world.explore.see(self.world.sight(self.player_pos, is_on_summit, self.is_disoriented))
+        self.fog_key = key
+
+        self.world.trim()
         self.update()
         
     def get_move_cost(self, tile):
@@ -1259,6 +961,7 @@ class HexMapWidget(QWidget):
             current_tile = self.world.tiles.get(self.player_pos)
             if current_tile:
                 current_tile.trap_owner = None
+            self.world.mark_dirty_at(self.player_pos)
 
         if self.is_buried and self.rock_debt <= 0: self.is_buried = False; updated = True; tooltip("Dug out of the rubble.")
         if self.is_burned and self.burn_debt <= 0: self.is_burned = False; updated = True; tooltip("Cooled down!")
@@ -1268,30 +971,8 @@ class HexMapWidget(QWidget):
             self.is_disoriented = False
             updated = True
             
-            if hasattr(self, 'lost_memory') and self.lost_memory:
-                
-                # Case 1: New Robust Dictionary Memory
-                if isinstance(self.lost_memory, dict):
-                    for c_str, state in self.lost_memory.items():
-                        if "," in c_str:
-                            parts = c_str.split(',')
-                            q, r = int(parts[0]), int(parts[1])
-                            if (q, r) in self.world.tiles:
-                                # Restore EXACTLY as it was
-                                self.world.tiles[(q, r)].visible = state.get("vis", False)
-                                self.world.tiles[(q, r)].visited = state.get("vst", False)
-
-                # Case 2: Old List Memory (Legacy Fallback)
-                elif isinstance(self.lost_memory, list):
-                    for c_str in self.lost_memory:
-                        if "," in c_str:
-                            parts = c_str.split(',')
-                            q, r = int(parts[0]), int(parts[1])
-                            if (q, r) in self.world.tiles:
-                                self.world.tiles[(q, r)].visited = True # Best guess
-                
-                # Clear memory
-                self.lost_memory = [] if isinstance(self.lost_memory, list) else {}
+            # The explored bits were never touched: dropping the mask restores them EXACTLY as they were
+            self.lost_memory = fog.recovered(self.lost_memory)
             
             tooltip("Vision fully restored!")
             self.update_fog_of_war()
@@ -1341,7 +1022,7 @@ class HexMapWidget(QWidget):
             return
 
         # Movement Logic
-        if clicked in self.world.get_neighbors(*self.player_pos) and clicked in self.world.tiles:
+        if self.world.topology.is_adjacent(self.player_pos, clicked):
             tile = self.world.tiles[clicked]
             if tile.type in ["wall", "lake"]: tooltip("Blocked."); return
             
@@ -1380,24 +1061,11 @@ class HexMapWidget(QWidget):
         elif tile.type == "dunes":
              if not self.is_disoriented:
                  ModernAlert(self, "BLINDED", "Sandstorm! Map obscured.", "#f1c40f").exec()
-                 self.is_disoriented = True; self.disorientation_debt = 300
+                 self.is_disoriented = True; self.disorientation_debt = SANDSTORM_REVIEWS
                  
-                 # Save EXACT state of every tile
-                 snapshot = {}
-                 for c, t in self.world.tiles.items():
-                     # Save if it has ANY progress (visible or visited), 
-                     # but don't hide the Start or Current Position
-                     if (t.visible or t.visited) and c != self.world.start_pos and c != target:
-                         coord_str = f"{c[0]},{c[1]}"
-                         snapshot[coord_str] = {
-                             "vis": t.visible,
-                             "vst": t.visited
-                         }
-                         # Now hide it
-                         t.visible = False
-                         t.visited = False
-                 
-                 self.lost_memory = snapshot
+                 # Memory is masked, not copied: reviews give it back through a restore cursor (see realm/fog.py)
+                 topo = self.world.topology; keep = (topo.ids[self.world.start_pos], topo.ids[target])  # As before: start and here stay known
+                 self.lost_memory = fog.blind(self.lost_memory, len(topo), keep)
         # -----------------------------------
         
         elif tile.type == "swamp" and random.random() < 0.2: 
@@ -1421,7 +1089,7 @@ class HexMapWidget(QWidget):
                 ModernAlert(self, "TRAP!", "It's a trap! (100 Reviews)", "#e74c3c").exec()
                 del self.shared_traps[target] 
 
-        if hasattr(self, 'radar_targets') and self.radar_targets:
+        if self.radar_targets:
             t_str = f"{target[0]},{target[1]}"
             if t_str in self.radar_targets: self.radar_targets.remove(t_str)
 
@@ -1443,12 +1111,12 @@ class HexMapWidget(QWidget):
         self.network.do_send_move(target[0], target[1], False)
 
     def pixel_to_hex(self, x, y):
-        cx, cy = self.width()/2, self.height()/2; q = (2./3 * (x-cx)) / self.hex_r; r = (-1./3 * (x-cx) + math.sqrt(3)/3 * (y-cy)) / self.hex_r
+        cx, cy = self.origin; q = (2./3 * (x-cx)) / self.hex_r; r = (-1./3 * (x-cx) + SQRT3/3 * (y-cy)) / self.hex_r
         rq, rr, rs = round(q), round(r), round(-q-r)
         if abs(rq-q) > abs(rr-r) and abs(rq-q) > abs(rs-(-q-r)): rq = -rr-rs
         elif abs(rr-r) > abs(rs-(-q-r)): rr = -rq-rs
         return (int(rq), int(rr))
-    def get_hex_center(self, q, r): return (self.width()/2 + self.hex_r * (3/2 * q), self.height()/2 + self.hex_r * (math.sqrt(3)/2 * q + math.sqrt(3) * r))
+    def get_hex_center(self, q, r): return (self.origin[0] + self.hex_r * (3/2 * q), self.origin[1] + self.hex_r * (SQRT3/2 * q + SQRT3 * r))
     def draw_status_overlay(self, p):
         p.save(); p.setClipRect(self.rect()); w = self.width(); h = self.height(); pulse = (math.sin(self.anim_time * 2.5) + 1.0) / 2.0 
         
@@ -1501,109 +1169,144 @@ class HexMapWidget(QWidget):
              for i in range(40): size = (i % 3) + 2; speed = 60 + (i % 40); ember_alpha = int(150 + math.sin(self.anim_time * 10 + i)*100); ember_alpha = max(0, min(255, ember_alpha)); col = QColor(255, 200, 50, ember_alpha) if i % 3 != 0 else QColor(255, 80, 50, ember_alpha); p.setBrush(col); p.drawEllipse(QPointF((i * 43) % w, h - ((self.anim_time * speed + i * 20) % (h + 50))), size, size)
         
         p.restore()
+    def cost_state(self):
+        # Everything get_move_cost() reads besides the tile
+        avg = StatEngine.get_today_stats()['avg_time']
+        return (self.cold_stacks, 0 < avg < 8.0)
+    def render_chunks(self):
+        # Tile ids per render chunk: the world's 8x8 axial chunks (realm/chunks.py)
+        topo = self.world.topology
+        if self.chunk_members is None or self.chunk_members[0] is not topo:
+            members = {}
+            for i, c in enumerate(topo.coords): members.setdefault(chunk_of(c), []).append(i)
+            self.chunk_members = (topo, members)
+        return self.chunk_members[1]
+    def paint_terrain(self, p, my_uid):
+        # Terrain, icons, fog and cost labels, cached per render chunk as a pixmap at device resolution.
+        # A chunk is re-rasterized only when its world.chunk_versions entry moves (fog, traps) or when
+        # something every chunk depends on changes (size, sandstorm, move costs). Returns the tiles
+        # with animated parts (own traps, trap rings, the Artifact) for draw_tile() to do per frame.
+        mem = self.lost_memory; dpr = self.devicePixelRatioF()
+        frame = (self.width(), self.height(), dpr, self.is_disoriented, self.player_pos if self.is_disoriented else None,
+                 mem.get("epoch"), mem.get("cursor"), self.cost_state(), my_uid)
+        if frame != self.render_frame: self.render_cache = {}; self.render_frame = frame
+        versions = self.world.chunk_versions; flags = None; animated = []
+        for key, ids in self.render_chunks().items():
+            version = versions.get(key, 0); cached = self.render_cache.get(key)
+            if cached is None or cached[0] != version:
+                if flags is None:
+                    ex = self.world.explore; n = len(self.world.topology)
+                    flags = (bitset.flags(ex.visible, n), bitset.flags(ex.visited & ~fog.hidden(mem) | ex.visible, n))
+                cached = self.render_cache[key] = (version, *self.paint_chunk(ids, *flags, dpr, my_uid))
+            _, origin, pix, chunk_animated = cached
+            p.drawPixmap(origin, pix); animated.extend(chunk_animated)
+        return animated
+    def paint_chunk(self, ids, lit, seen, dpr, my_uid):
+        topo = self.world.topology; r = self.hex_r + 2
+        centers = [self.centers[i] for i in ids]
+        x0 = min(x for x, _ in centers) - r; y0 = min(y for _, y in centers) - r
+        w = max(x for x, _ in centers) + r - x0; h = max(y for _, y in centers) + r - y0
+        pix = QPixmap(max(1, math.ceil(w * dpr)), max(1, math.ceil(h * dpr))); pix.setDevicePixelRatio(dpr); pix.fill(Qt.GlobalColor.transparent)
+        p = QPainter(pix); p.setRenderHint(QPainter.RenderHint.Antialiasing); p.setFont(self.font()); p.translate(-x0, -y0)
+        dists = topo.distances_from(self.player_pos) if self.is_disoriented else None; animated = []
+        for i, (cx, cy) in zip(ids, centers):
+            is_revealed = lit[i]   # Active Sight (Bright)
+            is_visited = seen[i]   # Memory (Faded)
+            
+            # 1. Sandstorm Masking / 2. Hidden Tiles (Never Visited); unexplored chunks stay unbuilt
+            if (dists and dists[i] > 1) or not is_visited:
+                self.draw_hex(p, cx, cy, QColor("#ffffff"), QPen(QColor("#dfe6e9"), 1)); continue
+            c = topo.coords[i]; t = topo.tile(i)
+            if t.trap_owner == my_uid or c in self.active_traps or t.type == "exit": animated.append((c, t, is_revealed)); continue
+            self.draw_tile(p, c, t, is_revealed, my_uid)
+        p.end()
+        return QPointF(x0, y0), pix, animated
+    def draw_tile(self, p, c, t, is_revealed, my_uid):
+        cx, cy = self.get_hex_center(*c)
+        # 3. Draw Terrain (Base Color)
+        fill = QColor(TERRAIN_CONFIG[t.type]["color"])
+        
+        trap_pulse = (math.sin(self.anim_time * 0.8) + 1) / 2
+        if t.trap_owner == my_uid:
+            trap_col = QColor(231, 76, 60); trap_pulse = (math.sin(self.anim_time * 2.0) + 1) / 2; ratio = trap_pulse * 0.5 
+            r = int(fill.red() * (1 - ratio) + trap_col.red() * ratio); g = int(fill.green() * (1 - ratio) + trap_col.green() * ratio); b = int(fill.blue() * (1 - ratio) + trap_col.blue() * ratio); fill = QColor(r, g, b)
+        
+        self.draw_hex(p, cx, cy, fill, QPen(QColor(COLOR_HEX_BORDER), 1))
+        self.draw_vector_icon(p, cx, cy, t)
+        
+        # 4. Draw Trap Ring
+        if c in self.active_traps or t.trap_owner == my_uid:
+            p.save()
+            
+            # A. The Glowing Ring (Breathing size and opacity)
+            ring_alpha = int(60 + (trap_pulse * 140)) # Opacity range 60-200
+            # Size oscillates between 55% and 85% of hex radius
+            ring_size = self.hex_r * (0.35 + (trap_pulse * 0.2))
+            
+            ring_col = QColor(231, 76, 60)
+            ring_col.setAlpha(ring_alpha)
+            p.setPen(QPen(ring_col, 2.5)) # Thicker pen
+            p.setBrush(Qt.BrushStyle.NoBrush)
+            p.drawEllipse(QPointF(cx, cy), ring_size, ring_size)
+
+            # B. The Inner "Core" (Bright pulsating center dot)
+            core_size = 3 + (trap_pulse * 1.5) # Size range 5-8 pixels
+            core_col = QColor(255, 120, 120) # Brighter red center
+            # Core gets brighter as ring expands
+            core_col.setAlpha(int(180 + trap_pulse * 75)) 
+            p.setBrush(core_col)
+            p.setPen(Qt.PenStyle.NoPen)
+            p.drawEllipse(QPointF(cx, cy), core_size, core_size)
+
+            p.restore()
+
+        # 5. FOG OVERLAY (STRONGER EFFECT)
+        # Increased Alpha from 120 -> 170
+        if not is_revealed: 
+            self.draw_hex(p, cx, cy, QColor(255, 255, 255, 170), Qt.PenStyle.NoPen)
+        
+        # 6. Text Labels
+        txt = ""; 
+        if t.type == "mountain": txt = "CLIMB"
+        elif t.type == "ruins": txt = "STUDY"
+        elif t.cost > 0 or t.type == "swamp": txt = "FREE" if self.get_move_cost(t)==0 else f"${self.get_move_cost(t)}"
+        
+        if txt:
+            # Active = Bright White (230), Visited = Dim (100)
+            text_alpha = 230 if is_revealed else 100
+            font_scale = 0.20 if txt == "CLIMB" or txt == "STUDY" else 0.35; 
+            f = p.font(); f.setPointSize(max(5, int(self.hex_r * font_scale))); f.setBold(True); 
+            p.setFont(f); p.setPen(QColor(255, 255, 255, text_alpha))
+            p.drawText(QRectF(cx - self.hex_r, cy + self.hex_r * 0.35, self.hex_r * 2, self.hex_r * 0.5), Qt.AlignmentFlag.AlignCenter, txt)
     def paintEvent(self, e):
-        self.update_grid_metrics(); p = QPainter(self); p.setRenderHint(QPainter.RenderHint.Antialiasing); p.fillRect(self.rect(), QColor(COLOR_BG_CANVAS)); pulse = (math.sin(self.anim_time) + 1) / 2; my_uid = get_uid()
+        self.update_grid_metrics(); p = QPainter(self); p.setRenderHint(QPainter.RenderHint.Antialiasing); p.fillRect(self.rect(), QColor(COLOR_BG_CANVAS)); my_uid = get_uid()
         
-        for c, t in self.world.tiles.items():
-            cx, cy = self.get_hex_center(*c); 
-            dist = self.world.hex_dist(c, self.player_pos); 
-            is_revealed = t.visible   # Active Sight (Bright)
-            is_visited = t.visited    # Memory (Faded)
-            
-            # 1. Sandstorm Masking
-            if self.is_disoriented and dist > 1:
-                path = QPainterPath(); r = self.hex_r
-                for i in range(6): a = math.radians(60*i); x = cx + r*math.cos(a); y = cy + r*math.sin(a); path.lineTo(x,y) if i!=0 else path.moveTo(x,y)
-                path.closeSubpath(); p.setBrush(QColor("#ffffff")); p.setPen(QPen(QColor("#dfe6e9"), 1)); p.drawPath(path); continue 
-            
-            # 2. Hidden Tiles (Never Visited)
-            if not is_visited:
-                 path = QPainterPath(); r = self.hex_r
-                 for i in range(6): a = math.radians(60*i); x = cx + r*math.cos(a); y = cy + r*math.sin(a); path.lineTo(x,y) if i!=0 else path.moveTo(x,y)
-                 path.closeSubpath(); p.setBrush(QColor("#ffffff")); p.setPen(QPen(QColor("#dfe6e9"), 1)); p.drawPath(path); continue 
-            
-            # 3. Draw Terrain (Base Color)
-            fill = QColor(TERRAIN_CONFIG[t.type]["color"]); draw_trap_ring = False; trap_pulse = 0
-            
-            trap_pulse = (math.sin(self.anim_time * 0.8) + 1) / 2
-            if t.trap_owner == my_uid:
-                trap_col = QColor(231, 76, 60); trap_pulse = (math.sin(self.anim_time * 2.0) + 1) / 2; ratio = trap_pulse * 0.5 
-                r = int(fill.red() * (1 - ratio) + trap_col.red() * ratio); g = int(fill.green() * (1 - ratio) + trap_col.green() * ratio); b = int(fill.blue() * (1 - ratio) + trap_col.blue() * ratio); fill = QColor(r, g, b); draw_trap_ring = True
-            
-            border_pen = QPen(QColor(COLOR_HEX_BORDER), 1)
-            # Only highlight movement borders if actively visible or neighbor
-            if c in self.world.get_neighbors(*self.player_pos):
-                 if self.currency >= self.get_move_cost(t): border_pen = QPen(QColor("#2ecc71"), 3); border_pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
-            
-            self.draw_hex(p, cx, cy, fill, border_pen)
-            self.draw_vector_icon(p, cx, cy, t)
-            
-            # 4. Draw Trap Ring
-            if c in self.active_traps or t.trap_owner == my_uid:
-                p.save()
-                
-                # A. The Glowing Ring (Breathing size and opacity)
-                ring_alpha = int(60 + (trap_pulse * 140)) # Opacity range 60-200
-                # Size oscillates between 55% and 85% of hex radius
-                ring_size = self.hex_r * (0.35 + (trap_pulse * 0.2))
-                
-                ring_col = QColor(231, 76, 60)
-                ring_col.setAlpha(ring_alpha)
-                p.setPen(QPen(ring_col, 2.5)) # Thicker pen
-                p.setBrush(Qt.BrushStyle.NoBrush)
-                p.drawEllipse(QPointF(cx, cy), ring_size, ring_size)
-
-                # B. The Inner "Core" (Bright pulsating center dot)
-                core_size = 3 + (trap_pulse * 1.5) # Size range 5-8 pixels
-                core_col = QColor(255, 120, 120) # Brighter red center
-                # Core gets brighter as ring expands
-                core_col.setAlpha(int(180 + trap_pulse * 75)) 
-                p.setBrush(core_col)
-                p.setPen(Qt.PenStyle.NoPen)
-                p.drawEllipse(QPointF(cx, cy), core_size, core_size)
-
-                p.restore()
-
-            # 5. FOG OVERLAY (STRONGER EFFECT)
-            # Increased Alpha from 120 -> 170
-            if is_visited and not is_revealed: 
-                self.draw_hex(p, cx, cy, QColor(255, 255, 255, 170), Qt.PenStyle.NoPen)
-            
-            # 6. Text Labels
-            txt = ""; 
-            if t.type == "mountain": txt = "CLIMB"
-            elif t.type == "ruins": txt = "STUDY"
-            elif t.cost > 0 or t.type == "swamp": txt = "FREE" if self.get_move_cost(t)==0 else f"${self.get_move_cost(t)}"
-            
-            if (is_revealed or is_visited) and txt:
-                # Active = Bright White (230), Visited = Dim (100)
-                text_alpha = 230 if is_revealed else 100
-                font_scale = 0.20 if txt == "CLIMB" or txt == "STUDY" else 0.35; 
-                f = p.font(); f.setPointSize(max(5, int(self.hex_r * font_scale))); f.setBold(True); 
-                p.setFont(f); p.setPen(QColor(255, 255, 255, text_alpha))
-                p.drawText(QRectF(cx - self.hex_r, cy + self.hex_r * 0.35, self.hex_r * 2, self.hex_r * 0.5), Qt.AlignmentFlag.AlignCenter, txt)
+        # Cached terrain chunks, then what moves on top of them
+        for c, t, is_revealed in self.paint_terrain(p, my_uid): self.draw_tile(p, c, t, is_revealed, my_uid)
+        # Movement borders on affordable neighbours (always in sight, so always drawn)
+        topo = self.world.topology
+        for n in topo.neighbor_ids(self.player_pos):
+            if self.currency >= self.get_move_cost(topo.tile(n)):
+                border_pen = QPen(QColor("#2ecc71"), 3); border_pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
+                self.draw_hex(p, *self.centers[n], Qt.BrushStyle.NoBrush, border_pen)
 
         # --- DRAW PERSISTENT RADAR PING ---
-        if hasattr(self, 'radar_targets') and self.radar_targets:
-            targets = self.radar_targets
-            if isinstance(targets, str): targets = [targets]
-            for target_str in targets:
-                t_str = str(target_str).replace("(", "").replace(")", "").replace(" ", "")
-                if "," in t_str:
-                    parts = t_str.split(',')
-                    t_q = int(parts[0]); t_r = int(parts[1])
-                    ping_x, ping_y = self.get_hex_center(t_q, t_r)
-                    
-                    cycle_len = 7.0; t_ripple = self.anim_time % cycle_len
-                    if t_ripple < (cycle_len * 0.7):
-                        prog = t_ripple / (cycle_len * 0.7)
-                        rip_r = self.hex_r * (0.5 + (prog * 3.0))
-                        alpha = int(180 * (1.0 - (prog**2.5)))
-                        p.setBrush(Qt.BrushStyle.NoBrush); p.setPen(QPen(QColor(255, 0, 255, alpha), 2)) 
-                        p.drawEllipse(QPointF(ping_x, ping_y), rip_r, rip_r)
-                    
-                    p.setPen(Qt.PenStyle.NoPen); p.setBrush(QColor(255, 0, 255, 150))
-                    p.drawEllipse(QPointF(ping_x, ping_y), self.hex_r * 0.3, self.hex_r * 0.3)
+        if self.radar_targets:
+            # Always a list of "q,r" strings (see realm/schema.py)
+            for target_str in self.radar_targets:
+                t_q, t_r = target_str.split(','); t_q = int(t_q); t_r = int(t_r)
+                ping_x, ping_y = self.get_hex_center(t_q, t_r)
+                
+                cycle_len = 7.0; t_ripple = self.anim_time % cycle_len
+                if t_ripple < (cycle_len * 0.7):
+                    prog = t_ripple / (cycle_len * 0.7)
+                    rip_r = self.hex_r * (0.5 + (prog * 3.0))
+                    alpha = int(180 * (1.0 - (prog**2.5)))
+                    p.setBrush(Qt.BrushStyle.NoBrush); p.setPen(QPen(QColor(255, 0, 255, alpha), 2)) 
+                    p.drawEllipse(QPointF(ping_x, ping_y), rip_r, rip_r)
+                
+                p.setPen(Qt.PenStyle.NoPen); p.setBrush(QColor(255, 0, 255, 150))
+                p.drawEllipse(QPointF(ping_x, ping_y), self.hex_r * 0.3, self.hex_r * 0.3)
         
         # Player & HUD
         my_col = QColor(PALETTE["p0_hex"] if self.profile_id == 0 else PALETTE["p1_hex"])
@@ -1726,9 +1429,9 @@ class HexMapWidget(QWidget):
         elif dist > 16: bars = 1
         p.setPen(Qt.PenStyle.NoPen); bar_w = 4; spacing = 3; start_x = center_pt.x() - 8; base_y = center_pt.y() + 8; p.setBrush(QColor("#e74c3c") if bars >= 1 else QColor(255,255,255,50)); p.drawRoundedRect(QRect(int(start_x), int(base_y - 6), bar_w, 6), 1, 1); p.setBrush(QColor("#f1c40f") if bars >= 2 else QColor(255,255,255,50)); p.drawRoundedRect(QRect(int(start_x + bar_w + spacing), int(base_y - 10), bar_w, 10), 1, 1); p.setBrush(QColor("#2ecc71") if bars >= 3 else QColor(255,255,255,50)); p.drawRoundedRect(QRect(int(start_x + (bar_w + spacing)*2), int(base_y - 14), bar_w, 14), 1, 1)
     def draw_hex(self, p, cx, cy, fill, pen):
-        path = QPainterPath(); r = self.hex_r
-        for i in range(6): a = math.radians(60*i); x = cx + r*math.cos(a); y = cy + r*math.sin(a); path.lineTo(x,y) if i!=0 else path.moveTo(x,y)
-        path.closeSubpath(); p.setBrush(fill); p.setPen(pen if pen else Qt.PenStyle.NoPen); p.drawPath(path)
+        # The cached outline from update_grid_metrics(), moved into place by the painter transform
+        p.setBrush(fill); p.setPen(pen if pen else Qt.PenStyle.NoPen)
+        p.translate(cx, cy); p.drawPath(self.hex_path); p.translate(-cx, -cy)
     def draw_vector_icon(self, p, cx, cy, tile):
         t_type = tile.type; s = self.hex_r; 
         p.setBrush(QColor(255,255,255, 200)); p.setPen(Qt.PenStyle.NoPen)
@@ -2064,7 +1767,7 @@ class ShopDialog(QDialog):
         self.accept()
 
 class RealmDialog(QDialog):
-    match_found_signal = pyqtSignal(int); opponent_left_signal = pyqtSignal(); lobby_state_signal = pyqtSignal(str); match_result_signal = pyqtSignal(str); stats_received_signal = pyqtSignal(int, int); match_expired_signal = pyqtSignal()
+    match_found_signal = pyqtSignal(int); opponent_left_signal = pyqtSignal(); lobby_state_signal = pyqtSignal(str); match_result_signal = pyqtSignal(str); stats_received_signal = pyqtSignal(int, int); match_expired_signal = pyqtSignal(); idle_status_signal = pyqtSignal()
     def __init__(self, mw):
         self.profile_id = mw.pm.name
         super().__init__(mw); self.setWindowTitle("Anki Realm Battle"); self.resize(1200, 800); self.setStyleSheet(f"background-color: {COLOR_BG_WIDGET}; color: {COLOR_TEXT_MAIN}; {STYLE_BUTTON_CSS}")
@@ -2131,22 +1834,32 @@ class RealmDialog(QDialog):
 
         self.worker.log_message.connect(self.lobby.log)
         
+        # Match worlds are built off the UI thread (see enter_match)
+        self.loader = WorldLoader(); self.awaiting_seed = None
+        self.loader.world_ready.connect(self.on_world_ready)
+
         # 4. Connect Signals to local methods
-        self.match_found_signal.connect(self.load_map_view)
+        self.match_found_signal.connect(self.enter_match)
         self.opponent_left_signal.connect(self.on_opponent_left)
         self.lobby_state_signal.connect(self.restore_lobby_state)
         self.match_result_signal.connect(self.on_match_result)
         self.stats_received_signal.connect(self.lobby.update_stats) 
         self.match_expired_signal.connect(self.on_match_expired)
+        self.idle_status_signal.connect(self.on_idle_status)
 
         # 5. Initialize Timers
         self.timer = QTimer(self)
         # Use self.worker here to be consistent
         self.timer.timeout.connect(self.worker.do_status_check) 
         
-        self.sync_timer = QTimer(self)
-        self.sync_timer.timeout.connect(self.sync_state_from_disk)
-        self.sync_timer.start(2000)
+        # Review-driven changes arrive as deltas; the file watcher only catches
+        # writes from outside this process. An idle dialog does no work.
+        self.state_version = 0
+        state_events.changed.connect(self.on_state_changed)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_save_file_changed)
+        self.watcher.directoryChanged.connect(self.on_save_file_changed)
+        self.watch_save_files()
         
         # 6. Startup Check (Changed to use the worker)
         # We use a singleShot here to ensure the UI is fully painted before network hits
@@ -2168,12 +1881,13 @@ class RealmDialog(QDialog):
         # 2. Predictive UI: Draw the cluster immediately
         # We assume the server will accept it.
         count = 1
-        self.map.active_traps.add((q, r))
+        self.map.active_traps.add((q, r)); self.map.world.mark_dirty_at((q, r))
         
         if hasattr(self, 'map') and hasattr(self.map, 'world'):
-            neighbors = self.map.world.get_neighbors(q, r)
-            for n in neighbors:
-                self.map.active_traps.add(n)
+            # Centre plus the ring around it, skipping spots off the map edge
+            topo = self.map.world.topology
+            for n in topo.ring((q, r), 1):
+                self.map.active_traps.add(topo.coords[n]); self.map.world.mark_dirty_at(topo.coords[n])
                 count += 1
         
         self.map.update()
@@ -2207,6 +1921,7 @@ class RealmDialog(QDialog):
                 # Mark it as 'owned' by opponent locally for the red render
                 if current_pos in self.map.world.tiles:
                     self.map.world.tiles[current_pos].trap_owner = "ENEMY_REVEALED"
+                self.map.world.mark_dirty_at(current_pos)
 
             self.map.update()
 
@@ -2235,84 +1950,42 @@ class RealmDialog(QDialog):
             d["stats"]["l"] += 1
             
         save_game_data(d)
+        record_match_result(self.world.seed if getattr(self, 'world', None) else None, "win" if is_win else "loss")
         self.lobby.update_stats(d["stats"]["w"], d["stats"]["l"])
 
     def simulate_review(self):
         # 1. Load Data
         d = load_game_data() 
-        if not d: d = {}
+        if not d: return
         
         dec = 25 
         
         # 2. Update Logic (In Memory)
-        d["currency"] = d.get("currency", 0) + 50 
-        d["wager_progress"] = d.get("wager_progress", 0) + (dec if d.get("wager_active") else 0)
+        d["currency"] += 50 
+        if d["wager_active"]: d["wager_progress"] += dec
         
         # --- FIX: UPDATE BOOLEAN FLAGS IMMEDIATELY ---
         # When debt hits 0, we must turn off the "is_X" flag immediately
         # so the pill disappears without waiting for a sync.
-        
-        # Freeze
-        if d.get("freeze_debt", 0) > 0:
-            d["freeze_debt"] = max(0, d["freeze_debt"] - dec)
-            if d["freeze_debt"] == 0: d["is_frozen"] = False
-
-        # Trap
-        if d.get("trap_debt", 0) > 0:
-            d["trap_debt"] = max(0, d["trap_debt"] - dec)
-            if d["trap_debt"] == 0: d["is_trapped"] = False
-
-        # Rockslide
-        if d.get("rock_debt", 0) > 0:
-            d["rock_debt"] = max(0, d["rock_debt"] - dec)
-            if d["rock_debt"] == 0: d["is_buried"] = False
-
-        # Climb
-        if d.get("climb_debt", 0) > 0:
-            d["climb_debt"] = max(0, d["climb_debt"] - dec)
-            if d["climb_debt"] == 0: d["is_climbing"] = False
-
-        # Burn
-        if d.get("burn_debt", 0) > 0:
-            d["burn_debt"] = max(0, d["burn_debt"] - dec)
-            if d["burn_debt"] == 0: d["is_burned"] = False
+        for debt, flag in (("freeze_debt", "is_frozen"), ("trap_debt", "is_trapped"), ("rock_debt", "is_buried"),
+                           ("climb_debt", "is_climbing"), ("burn_debt", "is_burned")):
+            if d[debt] > 0:
+                d[debt] = max(0, d[debt] - dec)
+                if d[debt] == 0: d[flag] = False
         # ---------------------------------------------
 
         # Archive Logic
-        if d.get("ruin_active"):
-            d["ruin_progress"] = d.get("ruin_progress", 0) + dec
+        if d["ruin_active"]:
+            d["ruin_progress"] += dec
             
-            if d["ruin_progress"] >= 500:
-                d["ruin_active"] = False
-                d["ruin_progress"] = 0
+            if d["ruin_progress"] >= RUIN_REVIEWS:
+                new_target, _ = complete_ruin(d)
                 
-                # Mark Complete
-                curr_loc = d.get("current_ruin_location")
-                if curr_loc:
-                    completed = d.get("completed_ruins", [])
-                    if curr_loc not in completed: completed.append(curr_loc)
-                    d["completed_ruins"] = completed
-                    d["current_ruin_location"] = None
-
-                # Radar Logic
-                tiles_dict = d.get("world", {}).get("tiles", {})
-                current_pings = d.get("radar_targets", [])
-                possible_pings = []
-                
-                for k, v in tiles_dict.items():
-                    # --- FIX: Check 'visited' here too ---
-                    if v.get("type") in ["key", "exit"] and not v.get("visited", False):
-                        if k not in current_pings: possible_pings.append(k)
-                
-                if possible_pings:
-                    new_target = str(random.choice(possible_pings))
-                    current_pings.append(new_target)
-                    d["radar_targets"] = current_pings
-                    
+                if new_target:
                     if hasattr(self, 'map'):
-                        self.map.radar_targets = current_pings
+                        self.map.radar_targets = list(d["radar_targets"])
                         self.map.ruin_active = False
-                        self.map.completed_ruins = completed
+                        self.map.completed_ruins = list(d["completed_ruins"])
                         self.map.update() 
                         QApplication.processEvents()
 
@@ -2324,46 +1997,10 @@ class RealmDialog(QDialog):
                     ModernAlert(self, "ARCHIVE EMPTY", "No unknown signals remain.\n(All Keys/Artifacts visited)", "#8e44ad").exec()
         
         # Sandstone / Disorientation Logic
-        if d.get("disorientation_debt", 0) > 0: 
+        if d["disorientation_debt"] > 0: 
             d["disorientation_debt"] = max(0, d["disorientation_debt"] - dec)
-            
-            lost_mem = d.get("lost_memory")
-            
-            if lost_mem:
-                # If debt is 0, RESTORE EVERYTHING. Otherwise, restore chunk.
-                if d["disorientation_debt"] == 0:
-                    count_to_restore = 999999 
-                else:
-                    count_to_restore = 5
-                
-                # Robust Dict Handling
-                if isinstance(lost_mem, dict):
-                    keys = list(lost_mem.keys())
-                    tiles_dict = d.get("world", {}).get("tiles", {})
-                    
-                    for _ in range(min(len(keys), count_to_restore)):
-                        k = keys.pop(0)
-                        state = lost_mem.pop(k) 
-                        if k in tiles_dict:
-                            tiles_dict[k]["visible"] = state.get("vis", False)
-                            tiles_dict[k]["visited"] = state.get("vst", False)
-                    
-                    d["lost_memory"] = lost_mem
-                    d["world"]["tiles"] = tiles_dict
-
-                # Legacy List Handling (Fallback)
-                elif isinstance(lost_mem, list):
-                    restored = []
-                    for _ in range(min(len(lost_mem), count_to_restore)):
-                        restored.append(lost_mem.pop(0))
-                    
-                    tiles_dict = d.get("world", {}).get("tiles", {})
-                    for c_str in restored:
-                        if c_str in tiles_dict: tiles_dict[c_str]["visited"] = True
-                    
-                    d["lost_memory"] = lost_mem
-                    d["world"]["tiles"] = tiles_dict
-            
+            # If debt is 0, RESTORE EVERYTHING. Otherwise, restore chunk.
+            restore_memory(d, RESTORE_ALL if d["disorientation_debt"] == 0 else 5)
             if d["disorientation_debt"] == 0: d["is_disoriented"] = False
 
         # 3. Save to Disk
@@ -2374,27 +2011,27 @@ class RealmDialog(QDialog):
             self.map.currency = d["currency"]
             
             # Values
-            self.map.freeze_debt = d.get("freeze_debt", 0)
-            self.map.trap_debt = d.get("trap_debt", 0)
-            self.map.rock_debt = d.get("rock_debt", 0)
-            self.map.climb_debt = d.get("climb_debt", 0)
-            self.map.burn_debt = d.get("burn_debt", 0)
-            self.map.disorientation_debt = d.get("disorientation_debt", 0)
+            self.map.freeze_debt = d["freeze_debt"]
+            self.map.trap_debt = d["trap_debt"]
+            self.map.rock_debt = d["rock_debt"]
+            self.map.climb_debt = d["climb_debt"]
+            self.map.burn_debt = d["burn_debt"]
+            self.map.disorientation_debt = d["disorientation_debt"]
             
             # --- CRITICAL FIX: UPDATE BOOLEANS TOO ---
             # This ensures the visual status pills disappear INSTANTLY
-            self.map.is_frozen = d.get("is_frozen", False)
-            self.map.is_trapped = d.get("is_trapped", False)
-            self.map.is_buried = d.get("is_buried", False)
-            self.map.is_climbing = d.get("is_climbing", False)
-            self.map.is_burned = d.get("is_burned", False)
-            self.map.is_disoriented = d.get("is_disoriented", False)
+            self.map.is_frozen = d["is_frozen"]
+            self.map.is_trapped = d["is_trapped"]
+            self.map.is_buried = d["is_buried"]
+            self.map.is_climbing = d["is_climbing"]
+            self.map.is_burned = d["is_burned"]
+            self.map.is_disoriented = d["is_disoriented"]
             # -----------------------------------------
             
-            self.map.ruin_progress = d.get("ruin_progress", 0)
-            self.map.ruin_active = d.get("ruin_active", False)
-            self.map.completed_ruins = d.get("completed_ruins", [])
-            self.map.radar_targets = d.get("radar_targets", [])
+            self.map.ruin_progress = d["ruin_progress"]
+            self.map.ruin_active = d["ruin_active"]
+            self.map.completed_ruins = list(d["completed_ruins"])
+            self.map.radar_targets = list(d["radar_targets"])
             
             current_tile = self.map.world.tiles.get(self.map.player_pos)
             if current_tile and current_tile.type == "mountain" and self.map.climb_debt == 0:
@@ -2402,6 +2039,39 @@ class RealmDialog(QDialog):
 
             self.map.update()
 
+    def on_state_changed(self, version, change):
+        if not hasattr(self, 'map') or version <= self.state_version: return
+        self.state_version = version
+        fields = change["fields"]
+
+        for key in ("currency", "freeze_debt", "trap_debt", "rock_debt", "climb_debt", "burn_debt", "disorientation_debt",
+                    "lost_memory", "ruin_active", "ruin_progress", "completed_ruins", "current_ruin_location", "radar_targets",
+                    "wager_active", "wager_progress"):
+            if key in fields: setattr(self.map, key, fields[key])
+
+        map_tiles = self.map.world.tiles; ids = self.map.world.topology.ids
+        # Newly visited elsewhere: lit until the next fog pass, like our own sight
+        if self.map.world.explore.reveal(bitset.from_indices(ids[(q, r)] for q, r, vis, vst in change["tiles"] if vst and (q, r) in ids)):
+            self.map.fog_key = None
+
+        current_tile = map_tiles.get(self.map.player_pos)
+        if "climb_debt" in fields and current_tile and current_tile.type == "mountain":
+            self.map.update_fog_of_war()
+
+        self.map.check_recovery()
+        self.map.update()
+
+    def watch_save_files(self):
+        # Replaced/created files drop out of (or never enter) the watch list, so re-arm every time
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        store = get_save_store()
+        paths = [p for p in (*store.watch_paths(), os.path.dirname(store.path)) if p not in watched and os.path.exists(p)]
+        if paths: self.watcher.addPaths(paths)
+
+    def on_save_file_changed(self, path):
+        self.watch_save_files()
+        if get_save_store().changed_externally(): self.sync_state_from_disk()
+
     def sync_state_from_disk(self):
         if not hasattr(self, 'map'): return
         d = load_game_data()
@@ -2429,28 +2099,22 @@ class RealmDialog(QDialog):
 
         # Sync Standard Variables
         self.map.currency = d.get("currency", self.map.currency)
-        if "lost_memory" in d: self.map.lost_memory = d["lost_memory"]
+        if "lost_memory" in d: self.map.lost_memory = dict(d["lost_memory"])
         
         # Sync Archive & Radar
         if "ruin_active" in d: self.map.ruin_active = d["ruin_active"]
         if "ruin_progress" in d: self.map.ruin_progress = d["ruin_progress"]
-        if "completed_ruins" in d: self.map.completed_ruins = d["completed_ruins"]
+        if "completed_ruins" in d: self.map.completed_ruins = list(d["completed_ruins"])
         if "current_ruin_location" in d: self.map.current_ruin_location = d["current_ruin_location"]
-        if "radar_targets" in d: self.map.radar_targets = d["radar_targets"]
+        if "radar_targets" in d: self.map.radar_targets = list(d["radar_targets"])
         
         # Update Map Tiles (Reveal new ones)
         updated = False
-        disk_tiles = d.get("world", {}).get("tiles", {})
-        map_tiles = self.map.world.tiles
-        
-        for c_str, t_data in disk_tiles.items():
-            q, r = map(int, c_str.split(','))
-            if (q,r) in map_tiles:
-                local_t = map_tiles[(q,r)]
-                if t_data.get("visited") and not local_t.visited:
-                    local_t.visited = True
-                    local_t.visible = True
-                    updated = True
+        world = SavedWorld.of(d)
+        
+        # The save is this world's own encoding, so its bits use the same tile ids
+        if world and len(world.coords) == len(self.map.world.topology) and self.map.world.explore.reveal(world.bits["visited"]):
+            self.map.fog_key = None; updated = True
         
         if updated: self.map.update()
         
@@ -2485,12 +2149,15 @@ class RealmDialog(QDialog):
             elif status == 'queued': 
                 self.lobby_state_signal.emit("SEARCHING...")
             elif status == 'idle':
-                # FIX: If idle, just make sure the UI is in the correct state
-                # without triggering "Opponent Left"
-                self.lobby.reset_ui()
-                d = load_game_data() or {}
-                d["in_match"] = False
-                save_game_data(d)
+                self.idle_status_signal.emit()  # Runs on the UI thread, like the save it touches
+
+    def on_idle_status(self):
+        # FIX: If idle, just make sure the UI is in the correct state
+        # without triggering "Opponent Left"
+        self.lobby.reset_ui()
+        d = load_game_data() or {}
+        d["in_match"] = False
+        save_game_data(d)
 
     def restore_lobby_state(self, msg): self.lobby.set_status(msg); self.timer.start(2000)
     
@@ -2516,7 +2183,7 @@ class RealmDialog(QDialog):
         threading.Thread(target=_join_sequence, daemon=True).start()
 
     def cancel_matchmaking_from_lobby(self):
-        self.timer.stop() 
+        self.timer.stop(); self.awaiting_seed = None
         self.worker.do_leave() 
 
     def on_opponent_left(self):
@@ -2639,10 +2306,13 @@ class RealmDialog(QDialog):
                 return
             # -----------------------------------------------------------------
 
-            if status == 'queued': self.lobby.set_status("SEARCHING...")
+            seed = data.get('seed')
+            if status == 'queued':
+                self.lobby.set_status("SEARCHING...")
+                # Server announced the map before pairing us: build it while we wait
+                if seed: self.loader.prefetch(seed)
             elif status == 'active' or status == 'matched':
-                seed = data.get('seed')
-                if seed: self.load_map_view(seed)
+                if seed: self.enter_match(seed)
             return
 
         # 3. IF WE ARE IN GAME: Update Map Data Only
@@ -2696,8 +2366,25 @@ class RealmDialog(QDialog):
             
             # OVERWRITE the map's active traps with the Server's Truth
             # This ensures that when a trap is gone from server, it's gone from UI.
+            for c in self.map.active_traps ^ valid_trap_tiles: self.map.world.mark_dirty_at(c)
             self.map.active_traps = valid_trap_tiles
     
+    def enter_match(self, seed):
+        # Open the map right away if its world is ready; otherwise build it off-thread
+        # and keep the lobby responsive (on_world_ready opens it)
+        if self.loader.has(seed) or (hasattr(self, 'world') and self.world.seed == seed):
+            self.awaiting_seed = None; self.load_map_view(seed); return
+        if self.awaiting_seed == seed: return  # Status polls keep reporting the match while it builds
+        self.awaiting_seed = seed
+        self.lobby.set_status("BUILDING MAP...")
+        self.loader.prefetch(seed)
+
+    def on_world_ready(self, seed, world):
+        if seed != self.awaiting_seed: return
+        self.awaiting_seed = None
+        # If the worker failed (world is None), load_map_view builds it here as before
+        if not self.match_processed and self.stack.currentWidget() == self.lobby: self.load_map_view(seed)
+
     def load_map_view(self, seed):
         d = load_game_data() or {}
         self.currency = d.get("currency", 0) 
@@ -2720,10 +2407,10 @@ class RealmDialog(QDialog):
             d["is_buried"] = False; d["rock_debt"] = 0
             d["is_climbing"] = False; d["climb_debt"] = 0
             d["is_burned"] = False; d["burn_debt"] = 0
-            d["is_disoriented"] = False; d["disorientation_debt"] = 0; d["lost_memory"] = []
+            d["is_disoriented"] = False; d["disorientation_debt"] = 0; d["lost_memory"] = {}
             d["has_key"] = False
 
-            d["radar_target"] = None
+            d["radar_targets"] = []
             d["ruin_active"] = False
             d["ruin_progress"] = 0
             d["current_ruin_location"] = None
@@ -2738,8 +2425,12 @@ class RealmDialog(QDialog):
                 self.stack.setCurrentWidget(self.map); 
                 self.ctrl_bar.setVisible(True);
                 return
-        if saved_world and saved_world.get("seed") == seed: self.world = WorldMap.from_dict(saved_world)
-        else: self.world = WorldMap(0, 1, seed=seed)
+        self.world = None
+        if saved_world and saved_world.get("seed") == seed:
+            try: self.world = WorldMap.from_dict(saved_world)
+            except ValueError as e: print(f"Realm Load Error: {e}")  # Saved by another generator version
+        # Prebuilt by the loader, or cached terrain when this match was seen before
+        if self.world is None: self.world = self.loader.take(seed) or WorldMap.from_seed(seed)
         
         self.currency = d.get("currency", 0)
         self.map = HexMapWidget(self.world, self.currency, self.worker, parent=self)
@@ -2750,7 +2441,7 @@ class RealmDialog(QDialog):
         self.map.is_buried = d.get("is_buried", False); self.map.rock_debt = d.get("rock_debt", 0) 
         self.map.is_climbing = d.get("is_climbing", False); self.map.climb_debt = d.get("climb_debt", 0)
         self.map.is_burned = d.get("is_burned", False); self.map.burn_debt = d.get("burn_debt", 0)
-        self.map.is_disoriented = d.get("is_disoriented", False); self.map.disorientation_debt = d.get("disorientation_debt", 0); self.map.lost_memory = d.get("lost_memory", [])
+        self.map.is_disoriented = d.get("is_disoriented", False); self.map.disorientation_debt = d.get("disorientation_debt", 0); self.map.lost_memory = dict(d.get("lost_memory", {}))
         self.map.ruin_active = d.get("ruin_active", False)
         self.map.ruin_progress = d.get("ruin_progress", 0)
         self.map.trap_placed_signal.connect(self.on_trap_placed)
@@ -2821,7 +2512,10 @@ class RealmDialog(QDialog):
                     ModernAlert(self, "WAGER PLACED", "Do your next 200 reviews!\nKeep retention > 90%.", "#9b59b6").exec()
                     
     def closeEvent(self, e): 
+        try: state_events.changed.disconnect(self.on_state_changed)
+        except TypeError: pass
         if not self.switching_profile: self.save()
+        flush_game_data()
         mw.reset(); super().closeEvent(e)
     def save(self):
         # 1. Load existing data so we don't wipe other fields (like 'stats')
@@ -2857,7 +2551,7 @@ class RealmDialog(QDialog):
 
             d["is_disoriented"] = getattr(self.map, 'is_disoriented', False)
             d["disorientation_debt"] = getattr(self.map, 'disorientation_debt', 0)
-            d["lost_memory"] = getattr(self.map, 'lost_memory', [])
+            d["lost_memory"] = getattr(self.map, 'lost_memory', {})
 
             d["is_frozen"] = getattr(self.map, 'is_frozen', False)
             d["freeze_debt"] = getattr(self.map, 'freeze_debt', 0)
@@ -2881,8 +2575,7 @@ class RealmDialog(QDialog):
         save_game_data(d)
 
     def reset(self):
-        p = get_save_path()
-        if os.path.exists(p): os.remove(p)
+        delete_game_data()
         save_game_data({"uid": str(uuid.uuid4())})
         self.close(); showInfo("Factory Reset Complete. Please reopen.")
     def add_funds(self, a): self.currency += a; self.sync(self.currency); self.save()
@@ -2932,12 +2625,12 @@ gui_hooks.webview_did_receive_js_message.append(msg_handler)
 def append_reviewer_overlay(content, context):
     if not isinstance(context, aqt.reviewer.Reviewer): return
     d = load_game_data()
-    if not d or not d.get("in_match", False): 
+    if not d or not d["in_match"]: 
         return
     pills = generate_pills_html(d)
     html = f"""<div style="position: fixed; bottom: 20px; right: 20px; z-index: 9999; background: rgba(30, 39, 46, 0.92); backdrop-filter: blur(4px); padding: 10px 16px; border-radius: 12px; box-shadow: 0 4px 15px rgba(0,0,0,0.25); border: 1px solid rgba(255,255,255,0.1); display: flex; flex-direction: column; align-items: flex-end; font-family: sans-serif;">
         <div style="display: flex; align-items: center; margin-bottom: 4px;">
-            <div id="realm-coins" style="color: #f1c40f; font-weight: 900; font-size: 18px; text-shadow: 0 2px 4px rgba(0,0,0,0.3);">{d.get('currency', 0)}</div>
+            <div id="realm-coins" style="color: #f1c40f; font-weight: 900; font-size: 18px; text-shadow: 0 2px 4px rgba(0,0,0,0.3);">{d['currency']}</div>
             <div style="color: #bdc3c7; font-size: 10px; font-weight: 700; margin-left: 6px; letter-spacing: 0.5px;">COINS</div>
         </div>
         <div id="realm-pills-container" style="display: flex; flex-wrap: wrap; justify-content: flex-end;">{pills}</div>
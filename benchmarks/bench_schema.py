@@ -0,0 +1,146 @@
+"""
+Review hot path before and after the schema migration (realm/schema.py).
+
+"legacy" is the pre-migration on_card_answered logic, condensed and with
+the tooltips dropped: every field read through d.get(key, default) and both
+lost_memory shapes handled at runtime. "migrated" is realm.review.apply_review
+on the same save after one migrate() at load.
+
+    python benchmarks/bench_schema.py [reviews]
+"""
+import copy
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realm.world import WorldMap, SavedWorld
+from realm.schema import migrate
+from realm.review import apply_review
+
+def legacy_review(d, ease, time_taken):
+    if ease > 1: d["currency"] = d.get("currency", 0) + 5
+    world = None
+    if d.get("ruin_active"):
+        d["ruin_progress"] = d.get("ruin_progress", 0) + 1
+        if d["ruin_progress"] >= 500:
+            d["ruin_active"] = False; d["ruin_progress"] = 0
+            curr_loc = d.get("current_ruin_location")
+            if curr_loc:
+                completed = d.get("completed_ruins", [])
+                if curr_loc not in completed: completed.append(curr_loc)
+                d["completed_ruins"] = completed; d["current_ruin_location"] = None
+            world = SavedWorld.of(d)
+            current_pings = d.get("radar_targets", [])
+            if isinstance(current_pings, str): current_pings = [current_pings]
+            possible = [world.key(i) for i in (world.find_types("key", "exit") if world else [])
+                        if not world.get("visited", i) and world.key(i) not in current_pings]
+            if possible: current_pings.append(str(random.choice(possible))); d["radar_targets"] = current_pings
+    if d.get("wager_active", False):
+        d["wager_progress"] = d.get("wager_progress", 0) + 1
+        if ease > 1: d["wager_correct"] = d.get("wager_correct", 0) + 1
+        if d["wager_progress"] >= 200:
+            if d["wager_correct"] / 200.0 * 100.0 >= 90.0: d["currency"] += 500
+            d["wager_active"] = False; d["wager_progress"] = 0; d["wager_correct"] = 0
+    if d.get("freeze_debt", 0) > 0:
+        if time_taken() < 5000:
+            d["freeze_debt"] -= 1
+            if d["freeze_debt"] <= 0: d["freeze_debt"] = 0; d["is_frozen"] = False
+    for debt, flag in (("trap_debt", "is_trapped"), ("climb_debt", "is_climbing"), ("burn_debt", "is_burned")):
+        if d.get(debt, 0) > 0:
+            d[debt] -= 1
+            if d[debt] <= 0: d[debt] = 0; d[flag] = False
+    if d.get("rock_debt", 0) > 0:
+        if ease >= 2:
+            d["rock_debt"] -= 1
+            if d["rock_debt"] <= 0: d["rock_debt"] = 0; d["is_buried"] = False
+        else: d["rock_debt"] += 5
+    if d.get("disorientation_debt", 0) > 0:
+        d["disorientation_debt"] -= 1
+        lost_mem = d.get("lost_memory")
+        if lost_mem:
+            if d["disorientation_debt"] <= 0: count = 999999
+            else:
+                total = len(lost_mem) if isinstance(lost_mem, list) else len(lost_mem.keys())
+                count = max(1, math.ceil(total / max(1, d["disorientation_debt"])))
+            world = SavedWorld.of(d)
+            if isinstance(lost_mem, dict):
+                keys = list(lost_mem.keys())
+                for _ in range(min(len(keys), int(count))):
+                    k = keys.pop(0); state = lost_mem.pop(k)
+                    if world and k in world.index:
+                        world.set("visible", world.index[k], state.get("vis", False))
+                        world.set("visited", world.index[k], state.get("vst", False))
+                d["lost_memory"] = lost_mem
+            elif isinstance(lost_mem, list):
+                restored = [lost_mem.pop(0) for _ in range(min(len(lost_mem), int(count)))]
+                for c in restored:
+                    if world and c in world.index: world.set("visited", world.index[c], True)
+                d["lost_memory"] = lost_mem
+            if world: world.commit()
+        if d["disorientation_debt"] <= 0: d["disorientation_debt"] = 0; d["is_disoriented"] = False
+    return world
+
+def legacy_radar(targets):
+    # paintEvent's per-frame parse before migration
+    if isinstance(targets, str): targets = [targets]
+    out = []
+    for target_str in targets:
+        t_str = str(target_str).replace("(", "").replace(")", "").replace(" ", "")
+        if "," in t_str:
+            parts = t_str.split(","); out.append((int(parts[0]), int(parts[1])))
+    return out
+
+def migrated_radar(targets):
+    out = []
+    for target_str in targets:
+        t_q, t_r = target_str.split(","); out.append((int(t_q), int(t_r)))
+    return out
+
+def legacy_save():
+    world = WorldMap(0, 1, seed=4242)
+    coords = [f"{q},{r}" for (q, r) in list(world.tiles)[:300]]
+    # A sandstorm mid-recovery in the oldest shapes: list memory, string radar, sparse fields
+    return {"uid": "bench", "currency": 120, "in_match": True, "world": world.to_dict(),
+            "is_disoriented": True, "disorientation_debt": 300, "lost_memory": coords,
+            "ruin_active": True, "ruin_progress": 0, "current_ruin_location": "3,-2",
+            "wager_active": True, "trap_debt": 40, "is_trapped": True, "radar_targets": "(4, -1)"}
+
+def bench(fn, saves, reviews):
+    random.seed(1)
+    t0 = time.perf_counter()
+    for d in saves:
+        for i in range(reviews): fn(d, 1 + (i % 4 != 0) * 2, lambda: 3000)
+    return (time.perf_counter() - t0) / (len(saves) * reviews)
+
+def main():
+    reviews = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    rounds = 5
+    base = legacy_save()
+
+    t0 = time.perf_counter()
+    upgraded = copy.deepcopy(base); migrate(upgraded)
+    migrate_ms = (time.perf_counter() - t0) * 1e3
+
+    legacy = bench(legacy_review, [copy.deepcopy(base) for _ in range(rounds)], reviews)
+    migrated = bench(apply_review, [copy.deepcopy(upgraded) for _ in range(rounds)], reviews)
+
+    frames = 20000; legacy_targets = ["(4, -1)", "(7, 3)", "(-2, 5)"]; targets = ["4,-1", "7,3", "-2,5"]
+    t0 = time.perf_counter()
+    for _ in range(frames): legacy_radar(legacy_targets)
+    legacy_frame = (time.perf_counter() - t0) / frames
+    t0 = time.perf_counter()
+    for _ in range(frames): migrated_radar(targets)
+    migrated_frame = (time.perf_counter() - t0) / frames
+
+    print(f"one-time migrate          {migrate_ms:8.2f} ms")
+    print(f"review (legacy shapes)    {legacy * 1e6:8.2f} us")
+    print(f"review (migrated)         {migrated * 1e6:8.2f} us   x{legacy / migrated:.2f}")
+    print(f"radar parse (legacy)      {legacy_frame * 1e6:8.2f} us/frame")
+    print(f"radar parse (migrated)    {migrated_frame * 1e6:8.2f} us/frame   x{legacy_frame / migrated_frame:.2f}")
+
+if __name__ == "__main__":
+    main()
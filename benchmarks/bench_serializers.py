@@ -0,0 +1,65 @@
+"""
+Dump/load time and size of a saved match under each installed codec.
+
+Pass a save file to measure it; otherwise a mid-match save is built from a
+level-1 world (half explored, a few traps), once with the seed-only world
+the game writes and once with the full columnar world older saves carry.
+The first row is the old save_game_data: json.dump(indent=2).
+
+    python benchmarks/bench_serializers.py [lumina_save_<profile>.json]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realm import bitset, serializers
+from realm.world import WorldMap
+from realm.schema import migrate
+
+def sample_save(mode):
+    random.seed(7)
+    world = WorldMap(0, 1, seed=424242)
+    world.explore.visible = world.explore.visited = bitset.from_indices(range(0, len(world.tiles), 2))
+    for i, t in enumerate(world.tiles.values()):
+        if i % 97 == 0: t.trap_owner = "6f1c0e5a-0000-4000-8000-000000000000"; t.trap_group_id = f"g{i}"
+    d = {"uid": "6f1c0e5a-0000-4000-8000-000000000000", "username": "Explorer 6f1c", "category": "Medicine",
+         "in_match": True, "currency": 1375, "player_pos": [3, -2], "world": world.to_dict(mode),
+         "completed_ruins": ["4,-1"], "radar_targets": ["7,3"], "stats": {"w": 12, "l": 9}}
+    migrate(d)
+    return d
+
+def timed(fn, arg, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds): out = fn(arg)
+    return out, (time.perf_counter() - t0) / rounds * 1e6
+
+def report(label, d, rounds):
+    print(f"\n{label}")
+    print(f"{'codec':<18}{'bytes':>9}{'dump us':>11}{'load us':>11}")
+    raw, dump_us = timed(lambda o: json.dumps(o, indent=2), d, rounds)
+    _, load_us = timed(json.loads, raw, rounds)
+    print(f"{'json indent=2':<18}{len(raw.encode('utf-8')):>9}{dump_us:>11.1f}{load_us:>11.1f}")
+    for codec in serializers.CODECS:
+        for compress in (False, True):
+            raw, dump_us = timed(lambda o: serializers.dumps(o, codec, compress), d, rounds)
+            back, load_us = timed(serializers.loads, raw, rounds)
+            assert back == json.loads(json.dumps(d)), codec
+            name = codec + (" +zlib" if compress else "")
+            print(f"{name:<18}{len(raw):>9}{dump_us:>11.1f}{load_us:>11.1f}")
+
+def main():
+    rounds = 200
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f: d = serializers.loads(f.read())
+        report(os.path.basename(sys.argv[1]), d, rounds)
+        return
+    report("mid-match save, seed-only world (current format)", sample_save("seed"), rounds)
+    report("mid-match save, columnar world", sample_save("columns"), rounds)
+    print(f"\ninstalled codecs: {', '.join(serializers.CODECS)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Memory per Tile on a generated map: the compact __slots__ Tile against the
+old __dict__-backed one (kept below as LegacyTile for the comparison).
+
+    python benchmarks/bench_tiles.py [level]    # default level 50
+"""
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realm.world import WorldMap, Tile
+
+class LegacyTile:
+    # world.Tile before the compact representation
+    def __init__(self, q, r, variant=None):
+        self.q = q; self.r = r; self.type = "plains"; self.cost = 20
+        self.visible = False; self.visited = False; self.is_locked = False  # Fog flags now live in WorldMap.explore
+        self.trap_owner = None; self.variant = random.randint(0, 100) if variant is None else variant
+        self.trap_group_id = None
+
+def copy_tiles(cls, tiles):
+    out = []
+    for t in tiles:
+        c = cls(t.q, t.r, t.variant); c.type = t.type; c.cost = t.cost
+        c.is_locked = t.is_locked
+        c.trap_owner = t.trap_owner; c.trap_group_id = t.trap_group_id
+        out.append(c)
+    return out
+
+def bytes_per_tile(cls, tiles):
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        copies = copy_tiles(cls, tiles)
+        used = tracemalloc.get_traced_memory()[0] - base
+    finally: tracemalloc.stop()
+    return (used - sys.getsizeof(copies)) / len(copies)  # The list itself isn't per-tile cost
+
+def main():
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    w = WorldMap(0, level, seed=424242); tiles = list(w.tiles.values())
+    old = bytes_per_tile(LegacyTile, tiles); new = bytes_per_tile(Tile, tiles)
+    print(f"level {level}: {len(tiles)} tiles")
+    print(f"{'dict Tile':<14}{old:>8.1f} bytes/tile  {old * len(tiles) / 1024:>8.1f} KB")
+    print(f"{'slots Tile':<14}{new:>8.1f} bytes/tile  {new * len(tiles) / 1024:>8.1f} KB  ({(1 - new / old) * 100:.0f}% less)")
+
+if __name__ == "__main__":
+    main()
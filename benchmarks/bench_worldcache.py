@@ -0,0 +1,42 @@
+"""
+Time to get a match world: generated from scratch, read back from the
+on-disk world cache, and served from the in-memory layer cache.
+
+    python benchmarks/bench_worldcache.py [level]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realm import worldcache
+from realm.world import WorldMap, static_layer, generator_hash
+
+def timed(seeds, level):
+    t0 = time.perf_counter()
+    for s in seeds: WorldMap.from_seed(s, level)
+    return (time.perf_counter() - t0) / len(seeds) * 1e3
+
+def main():
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    seeds = list(range(500000, 500040))
+    directory = tempfile.mkdtemp(prefix="realm_worlds_")
+    try:
+        worldcache.configure(None)
+        static_layer.cache_clear(); cold = timed(seeds, level)
+        worldcache.configure(directory)
+        static_layer.cache_clear(); timed(seeds, level)  # Populate the disk cache
+        static_layer.cache_clear(); disk = timed(seeds, level)
+        warm = timed(seeds[-4:], level)  # Still in the in-memory LRU
+        size = sum(os.path.getsize(os.path.join(directory, n)) for n in os.listdir(directory)) / len(seeds)
+    finally: shutil.rmtree(directory, ignore_errors=True)
+    print(f"level {level}, generator {generator_hash()}")
+    print(f"{'generate':<14}{cold:>9.2f} ms")
+    print(f"{'disk cache':<14}{disk:>9.2f} ms  ({size / 1024:.1f} KB per world)")
+    print(f"{'memory cache':<14}{warm:>9.2f} ms")
+
+if __name__ == "__main__":
+    main()
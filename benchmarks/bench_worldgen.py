@@ -0,0 +1,129 @@
+"""
+World generation benchmark and regression check (headless: no Qt, no mw).
+
+Generates a fixed corpus of seeds at levels 1-50 with the generator the
+game would use (NumPy when installed, or --python for the reference) and
+reports per-phase time, tiles/sec and peak traced memory per level. Every
+world's terrain is fingerprinted and compared with the committed
+worldgen_fingerprints.json, so every run also proves that a speed-up didn't
+change any map (exit 1 if one did).
+
+    python benchmarks/bench_worldgen.py                       # report + fingerprint check
+    python benchmarks/bench_worldgen.py --save baseline.json  # record a timing baseline
+    python benchmarks/bench_worldgen.py --check baseline.json # exit 1 on a slowdown too
+    python benchmarks/bench_worldgen.py --update-fingerprints # after a deliberate generator change
+
+--check also fails if a level got slower than the baseline by more than
+--threshold. Timings are machine-specific, so only fingerprints are committed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realm import fastgen
+from realm.world import WorldMap, GENERATOR_VERSION, STATIC_KEYS, generator_hash
+
+LEVELS = (1, 5, 10, 20, 35, 50)
+SEEDS = tuple(100003 + 7919 * i for i in range(8))
+FINGERPRINTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worldgen_fingerprints.json")
+PHASES = ("growth", "smoothing", "biomes", "ruins", "forests", "lakes", "keys", "tiles")
+
+def generate(seed, level):
+    w = WorldMap(0, level, generate=False, seed=seed); w.generator = GENERATOR_VERSION
+    w.phase_times = {}; w.generate_world()
+    return w
+
+def fingerprint(world):
+    enc = world.columns()
+    static = {k: enc[k] for k in STATIC_KEYS}
+    static["type"] = [enc["legend"][t] for t in enc["type"]]; del static["legend"]  # Independent of legend order
+    return hashlib.sha1(json.dumps(static, separators=(",", ":")).encode("utf-8")).hexdigest()[:16]
+
+def peak_kb(seed, level):
+    tracemalloc.start()
+    try: generate(seed, level); return tracemalloc.get_traced_memory()[1] / 1024
+    finally: tracemalloc.stop()
+
+def run(levels, seeds, repeats):
+    report = {"generator": GENERATOR_VERSION, "code": generator_hash(), "path": "numpy" if fastgen.np is not None and fastgen.ENABLED else "python",
+              "levels": {}, "fingerprints": {}}
+    for level in levels:
+        phases = dict.fromkeys(PHASES, 0.0); total = 0.0; tiles = 0
+        for seed in seeds:
+            # Best of `repeats` per seed: the least disturbed run
+            best = None
+            for _ in range(repeats):
+                t0 = time.perf_counter(); w = generate(seed, level); elapsed = time.perf_counter() - t0
+                if best is None or elapsed < best[0]: best = (elapsed, w)
+            elapsed, w = best; total += elapsed; tiles += len(w.tiles)
+            for name, secs in w.phase_times.items(): phases[name] += secs
+            report["fingerprints"][f"{level}:{seed}"] = fingerprint(w)
+        n = len(seeds)
+        report["levels"][str(level)] = {"ms": total / n * 1e3, "tiles": tiles // n, "tiles_per_sec": tiles / total,
+                                        "peak_kb": peak_kb(seeds[0], level),
+                                        "phases_ms": {k: v / n * 1e3 for k, v in phases.items() if v}}
+    return report
+
+def print_report(report):
+    print(f"generator v{report['generator']} ({report['code']}), {report['path']} path")
+    shown = [p for p in PHASES if any(p in lv["phases_ms"] for lv in report["levels"].values())]
+    print(f"{'level':>5}{'tiles':>7}{'ms':>9}{'tiles/s':>10}{'peak KB':>9}" + "".join(f"{p[:9]:>10}" for p in shown))
+    for level, lv in report["levels"].items():
+        print(f"{level:>5}{lv['tiles']:>7}{lv['ms']:>9.2f}{lv['tiles_per_sec']:>10.0f}{lv['peak_kb']:>9.0f}"
+              + "".join(f"{lv['phases_ms'].get(p, 0):>10.2f}" for p in shown))
+
+def check_fingerprints(report, reference):
+    if reference["generator"] != report["generator"]:
+        return [f"fingerprints are for generator v{reference['generator']}, this is v{report['generator']}: run --update-fingerprints"]
+    changed = [k for k, fp in report["fingerprints"].items() if reference["fingerprints"].get(k, fp) != fp]
+    return [f"terrain changed for {len(changed)} level:seed pairs, e.g. {', '.join(changed[:5])}"] if changed else []
+
+def check(report, baseline, threshold):
+    failures = []
+    if baseline["generator"] == report["generator"]: failures += check_fingerprints(report, baseline)
+    if baseline.get("path") != report["path"]: print(f"baseline was taken on the {baseline.get('path')} path, this run is {report['path']}")
+    for level, lv in report["levels"].items():
+        base = baseline["levels"].get(level)
+        if base and lv["ms"] > base["ms"] * (1 + threshold):
+            failures.append(f"level {level}: {lv['ms']:.2f} ms vs baseline {base['ms']:.2f} ms (+{(lv['ms'] / base['ms'] - 1) * 100:.0f}%)")
+    return failures
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--save", metavar="JSON", help="write this run as the baseline")
+    ap.add_argument("--check", metavar="JSON", help="compare against a baseline; exit 1 on regression")
+    ap.add_argument("--update-fingerprints", action="store_true", help=f"rewrite {os.path.basename(FINGERPRINTS)} from this run")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown per level (default 0.25 = 25%%)")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--python", action="store_true", help="time the pure-Python reference generator")
+    ap.add_argument("--quick", action="store_true", help="levels 1 and 10, two seeds")
+    args = ap.parse_args()
+    if args.python: fastgen.ENABLED = False
+    levels, seeds = ((1, 10), SEEDS[:2]) if args.quick else (LEVELS, SEEDS)
+
+    report = run(levels, seeds, args.repeats)
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+        print(f"\nbaseline written to {args.save}")
+    if args.update_fingerprints:
+        if args.quick: sys.exit("--update-fingerprints needs the full corpus (drop --quick)")
+        with open(FINGERPRINTS, "w", encoding="utf-8") as f:
+            json.dump({"generator": report["generator"], "fingerprints": report["fingerprints"]}, f, indent=1, sort_keys=True); f.write("\n")
+        print(f"\nfingerprints written to {FINGERPRINTS}")
+    with open(FINGERPRINTS, encoding="utf-8") as f: failures = check_fingerprints(report, json.load(f))
+    if args.check:
+        with open(args.check, encoding="utf-8") as f: baseline = json.load(f)
+        failures += [msg for msg in check(report, baseline, args.threshold) if msg not in failures]
+    for msg in failures: print(f"FAIL {msg}")
+    if failures: sys.exit(1)
+    print("\nno regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Qt-free core of the add-on (persistence, world model). Nothing in here may
+# import aqt so it can be exercised headlessly.
@@ -0,0 +1,45 @@
+import base64
+
+# Bitsets are plain Python ints (bit i = tile index i). On disk they are the
+# little-endian bytes, base64 encoded, sized for the tile count.
+
+def encode(bits, n):
+    return base64.b64encode(bits.to_bytes((n + 7) // 8, "little")).decode("ascii")
+
+def decode(text):
+    return int.from_bytes(base64.b64decode(text), "little") if text else 0
+
+def indices(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+def changed(a_text, b_text):
+    """(indices set, indices cleared) going from one encoded bitset to another of the same size."""
+    a = decode(a_text); b = decode(b_text)
+    return list(indices(b & ~a)), list(indices(a & ~b))
+
+def assign(text, on, off):
+    # Absolute, so applying it twice is harmless (a journal replayed onto a base that already has it)
+    raw = base64.b64decode(text); bits = int.from_bytes(raw, "little") | from_indices(on)
+    bits &= ~from_indices(off)
+    return base64.b64encode(bits.to_bytes(len(raw), "little")).decode("ascii")
+
+def flip(text, idxs):
+    # Journals written before "bits" deltas toggled instead
+    raw = base64.b64decode(text); bits = int.from_bytes(raw, "little")
+    for i in idxs: bits ^= 1 << i
+    return base64.b64encode(bits.to_bytes(len(raw), "little")).decode("ascii")
+
+def from_indices(idxs):
+    bits = 0
+    for i in idxs: bits |= 1 << i
+    return bits
+
+def count(bits):
+    return bin(bits).count("1")
+
+def flags(bits, n):
+    """bits as n booleans, one conversion for the lot instead of a shift per index."""
+    return [c == "1" for c in reversed(format(bits, f"0{n}b"))] if n else []
@@ -0,0 +1,111 @@
+import collections
+import collections.abc
+from . import bitset
+
+# ==========================================
+# CHUNKED TILES
+# ==========================================
+# world.tiles for worlds decoded from columns (every saved or seed-built
+# match world). Terrain stays in the compact column layer (usually the
+# shared static_layer); Tile objects are only built per CHUNK_SIZE x
+# CHUNK_SIZE axial chunk, the first time fog, movement or a lookup touches a
+# tile in it. Per-tile state read from the save (locks, traps, cost
+# overrides) waits in a bitset / sparse maps until its chunk is built and
+# then lives on the Tiles. Fog state never does: it is the world's
+# Exploration bits, which the callers pass in as `shown`.
+#
+# `in`, len() and iteration answer from the coordinate index and never build
+# anything; values()/items() build every chunk (the map widget paints by tile
+# id through WorldMap.topology instead). Nothing is dropped while callers may hold
+# Tiles: only trim() evicts, and only chunks that are cold, unexplored and
+# clean, which are rebuilt from the layer if touched again.
+
+CHUNK_SIZE = 8
+MAX_LOADED_CHUNKS = 48
+
+def chunk_of(c): return (c[0] // CHUNK_SIZE, c[1] // CHUNK_SIZE)
+
+class ChunkIndex:
+    """Coordinate and chunk lookups over a column layer. Read-only, so worlds on the same layer share one."""
+    def __init__(self, layer):
+        self.coords = list(zip(layer["q"], layer["r"]))
+        self.ids = {c: i for i, c in enumerate(self.coords)}
+        self.members = {}  # chunk key -> tile ids
+        for i, c in enumerate(self.coords): self.members.setdefault(chunk_of(c), []).append(i)
+        keys = {k: k for k in self.members}
+        self.chunk_keys = [keys[chunk_of(c)] for c in self.coords]  # One tuple per chunk, not per tile
+
+class ChunkedTiles(collections.abc.Mapping):
+    def __init__(self, layer, state, index=None):
+        self.layer = layer
+        index = index or ChunkIndex(layer)
+        self.coords = index.coords; self.ids = index.ids; self.chunk_keys = index.chunk_keys; self.members = index.members
+        # Saved player state of tiles whose chunk isn't built yet
+        self.locked = bitset.decode(state.get("locked"))
+        self.traps = dict(state.get("traps", {})); self.groups = dict(state.get("trap_groups", {})); self.costs = dict(state.get("cost", {}))
+        self.stateful = {self.chunk_keys[i] for i in bitset.indices(self.locked)}
+        self.stateful.update(self.chunk_keys[int(k)] for m in (self.traps, self.groups, self.costs) for k in m)
+        self.loaded = collections.OrderedDict()  # chunk key -> {coord: Tile}, least recently used first
+
+    def __len__(self): return len(self.coords)
+    def __iter__(self): return iter(self.coords)
+    def __contains__(self, c): return c in self.ids
+
+    def __getitem__(self, c):
+        key = chunk_of(c); chunk = self.loaded.get(key)
+        if chunk is None:
+            if c not in self.ids: raise KeyError(c)
+            chunk = self._load(key)
+        else: self.loaded.move_to_end(key)
+        return chunk[c]
+
+    def _load(self, key):
+        # Imported here: world.py imports this module
+        from .world import Tile
+        layer = self.layer; legend = layer["legend"]; types = layer["type"]; variants = layer["variant"]
+        lck = self.locked
+        chunk = {}; mask = 0
+        for i in self.members[key]:
+            c = self.coords[i]; s = str(i); mask |= 1 << i
+            t = Tile(c[0], c[1], variants[i], legend[types[i]])
+            if s in self.costs: t.cost = self.costs.pop(s)
+            t.is_locked = bool(lck >> i & 1)
+            t.trap_owner = self.traps.pop(s, None); t.trap_group_id = self.groups.pop(s, None)
+            chunk[c] = t
+        # From here on the Tiles own this state
+        self.locked &= ~mask
+        self.stateful.discard(key)
+        self.loaded[key] = chunk
+        return chunk
+
+    def shown_chunks(self, shown):
+        chunk_keys = self.chunk_keys
+        return {chunk_keys[i] for i in bitset.indices(shown)}
+
+    def player_state(self):
+        """(locked, traps, trap_groups, cost) in the columnar encoding's shapes."""
+        lck = self.locked
+        from .world import TERRAIN_CONFIG
+        traps = dict(self.traps); groups = dict(self.groups); costs = dict(self.costs); ids = self.ids
+        for chunk in self.loaded.values():
+            for c, t in chunk.items():
+                i = ids[c]
+                if t.is_locked: lck |= 1 << i
+                if t.trap_owner is not None: traps[str(i)] = t.trap_owner
+                if t.trap_group_id: groups[str(i)] = t.trap_group_id
+                if t.cost != TERRAIN_CONFIG.get(t.type, {}).get("cost"): costs[str(i)] = t.cost
+        return lck, traps, groups, costs
+
+    def trim(self, max_chunks=MAX_LOADED_CHUNKS, shown=0):
+        """Drops the coldest clean chunks with no `shown` tile until at most max_chunks are built. Returns how many went."""
+        excess = len(self.loaded) - max_chunks; dropped = 0
+        if excess <= 0: return 0
+        from .world import TERRAIN_CONFIG
+        explored = self.shown_chunks(shown)
+        for key in list(self.loaded):
+            if dropped >= excess: break
+            if key in explored: continue  # Painted every frame
+            if all(not (t.is_locked or t.trap_owner is not None or t.trap_group_id) and t.cost == TERRAIN_CONFIG[t.type]["cost"]
+                   for t in self.loaded[key].values()):
+                del self.loaded[key]; dropped += 1
+        return dropped
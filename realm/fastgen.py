@@ -0,0 +1,190 @@
+import math
+from .placement import HexBuckets, CandidatePool, grow_blobs
+
+try: import numpy as np
+except ImportError: np = None
+
+# ==========================================
+# VECTORIZED WORLD GENERATION
+# ==========================================
+# Same worlds as WorldMap.generate_world_python(), tile for tile and variant
+# for variant, so it needs no generator version of its own: a client with
+# NumPy and one without still agree on every match seed.
+#
+# The deterministic work (neighbour lookups, smoothing counts, distances,
+# moisture, candidate filters) runs on axial coordinate arrays. Only the RNG
+# calls stay in Python, on the same world.rng streams and in exactly the
+# order the reference makes them: the frontier shuffles, one randint per tile
+# for its variant, the biome/ruin rolls and the blob growth of forests and lakes.
+
+ENABLED = True  # Switch off to force the pure-Python reference
+
+# Same order as WorldMap.get_neighbors()
+DIRECTIONS = ((1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1))
+
+# Biome classes, decided in bulk; the RNG picks within a class per tile
+INNER, MIDDLE, FAR_WET, FAR_DRY, LAKE, SWAMP, DUNES, MIXED = range(8)
+CHOICES = {
+    INNER: ["plains", "plains", "hills"], MIDDLE: ["hills", "plains", "forest"],
+    FAR_WET: ["tundra", "tundra", "wasteland"], FAR_DRY: ["volcanic", "wasteland", "mountain"],
+    SWAMP: ["swamp", "swamp", "swamp", "plains"], DUNES: ["dunes", "scrub", "dunes"],
+    MIXED: ["plains", "hills", "scrub", "mountain"],
+}
+
+class Grid:
+    """Dense occupancy over axial coordinates, grown as the world expands."""
+    def __init__(self, half=32):
+        self.half = half; self.occ = np.zeros((2 * half + 1, 2 * half + 1), dtype=np.int8)
+
+    def fit(self, coords):
+        need = int(np.abs(coords).max()) + 2 if len(coords) else 0
+        if need <= self.half: return
+        half = self.half
+        while half < need: half *= 2
+        occ = np.zeros((2 * half + 1, 2 * half + 1), dtype=np.int8)
+        o = half - self.half; n = self.occ.shape[0]
+        occ[o:o + n, o:o + n] = self.occ
+        self.half = half; self.occ = occ
+
+    def mark(self, coords):
+        self.fit(coords); self.occ[coords[:, 0] + self.half, coords[:, 1] + self.half] = 1
+
+    def has(self, coords):
+        self.fit(coords); return self.occ[coords[:, 0] + self.half, coords[:, 1] + self.half].astype(bool)
+
+    def neighbour_counts(self, coords):
+        # Occupied neighbours of each coordinate, as six shifted lookups
+        self.fit(coords); total = np.zeros(len(coords), dtype=np.int8)
+        for dq, dr in DIRECTIONS: total += self.occ[coords[:, 0] + dq + self.half, coords[:, 1] + dr + self.half]
+        return total
+
+def _around(coords):
+    # (len * 6, 2) neighbours, grouped per coordinate in DIRECTIONS order
+    return (coords[:, None, :] + np.array(DIRECTIONS)[None, :, :]).reshape(-1, 2)
+
+def _first_seen(coords, keep):
+    # Rows of coords[keep] in order of first occurrence
+    picked = coords[keep]
+    if not len(picked): return picked
+    ids = picked[:, 0].astype(np.int64) * 1_000_003 + picked[:, 1]
+    _, first = np.unique(ids, return_index=True)
+    return picked[np.sort(first)]
+
+def _hex_dist(coords, q=0, r=0):
+    dq = coords[:, 0] - q; dr = coords[:, 1] - r
+    return (np.abs(dq) + np.abs(dr) + np.abs(dq + dr)) / 2
+
+def generate_world_numpy(world):
+    # Imported here: world.py imports this module
+    from .world import BASE_MAP_SIZE, LEVEL_GROWTH, Tile
+    layout = world.rng.layout; variant = world.rng.variants.randint; biomes = world.rng.biomes; features = world.rng.features
+
+    target_size = BASE_MAP_SIZE + (world.level * LEVEL_GROWTH)
+    grid = Grid()
+    order = [(0, 0)]; variants = [variant(0, 100)]
+    grid.mark(np.zeros((1, 2), dtype=np.int64))
+
+    # --- Layered frontier growth ---
+    layer = np.zeros((1, 2), dtype=np.int64)
+    while len(order) < target_size:
+        around = _around(layer)
+        around = around[~grid.has(around)]
+        if not len(around): break
+        # The reference shuffles list(set(...)); insert in its order so the set iterates identically
+        next_layer = set(); next_layer.update(map(tuple, around.tolist()))
+        candidates = list(next_layer); layout.shuffle(candidates)
+        take_count = max(1, int(len(candidates) * 0.85)) if len(order) > 20 else len(candidates)
+        added = candidates[:min(take_count, target_size - len(order))]
+        for c in added: order.append(c); variants.append(variant(0, 100))
+        layer = np.array(added, dtype=np.int64).reshape(-1, 2)
+        grid.mark(layer)
+    world.phase("growth")
+
+    # --- Smoothing: fill gaps with >= 4 occupied neighbours ---
+    coords = np.array(order, dtype=np.int64)
+    for _ in range(3):
+        around = _around(coords)
+        keep = ~grid.has(around)
+        keep[keep] = grid.neighbour_counts(around[keep]) >= 4
+        fresh = _first_seen(around, keep)
+        if not len(fresh): break
+        for c in map(tuple, fresh.tolist()): order.append(c); variants.append(variant(0, 100))
+        grid.mark(fresh); coords = np.concatenate([coords, fresh])
+    world.phase("smoothing")
+
+    n = len(order); qs = coords[:, 0]; rs = coords[:, 1]
+    dist = _hex_dist(coords)
+    world.radius = radius = int(dist.max()) + 1
+
+    # --- Biomes ---
+    biomes.uniform(0, 2*math.pi)  # The reference's sector rotation: unused, but drawn to keep the RNG in step
+    # Moisture from math.sin/cos of each distinct q / r so values match the reference bit for bit
+    uq, q_idx = np.unique(qs, return_inverse=True); ur, r_idx = np.unique(rs, return_inverse=True)
+    moisture = np.array([math.sin(q * 0.25) for q in uq.tolist()])[q_idx] + np.array([math.cos(r * 0.25) for r in ur.tolist()])[r_idx]
+    band = np.select(
+        [dist <= 3, dist <= radius * 0.4, (dist > radius * 0.55) & (moisture > 0), dist > radius * 0.55,
+         moisture > 0.8, moisture > 0.2, moisture < -0.5],
+        [INNER, MIDDLE, FAR_WET, FAR_DRY, LAKE, SWAMP, DUNES], MIXED)
+    types = []
+    for b in band.tolist():
+        if b == LAKE: types.append("lake")
+        elif b == MIDDLE and biomes.random() > 0.94: types.append("mountain")
+        else: types.append(biomes.choice(CHOICES[b]))
+    world.phase("biomes")
+
+    # --- Ruins: rare, middle band, isolated ---
+    ruin_locs = HexBuckets(4)
+    for i in np.flatnonzero((dist >= 4) & (dist <= 9)).tolist():
+        if types[i] in ("lake", "mountain"): continue
+        if features.random() < 0.015:
+            c = order[i]
+            if not ruin_locs.any_within(c): types[i] = "ruins"; ruin_locs.add(c)
+
+    world.start_pos = (0, 0); types[0] = "start"
+    type_arr = np.array(types)
+    hard = np.flatnonzero(np.isin(type_arr, ("tundra", "wasteland", "volcanic")) & (dist > radius * 0.6)).tolist()
+    exit_i = features.choice(hard) if hard else int(np.argmax(dist))
+    world.exit_pos = order[exit_i]; types[exit_i] = "exit"
+    index = {c: i for i, c in enumerate(order)}
+    world.phase("ruins")
+
+    # --- Forests ---
+    type_arr = np.array(types)
+    not_special = np.ones(n, dtype=bool); not_special[[0, exit_i]] = False
+    pool = CandidatePool(order[i] for i in np.flatnonzero((dist > 2) & not_special & ~np.isin(type_arr, ("mountain", "volcanic", "tundra", "wasteland", "ruins"))).tolist())
+    _grow_blobs(world, types, index, pool, features.randint(4, 7), (6, 12), 30, ("plains", "hills", "scrub"), "forest")
+    world.phase("forests")
+
+    # --- Lakes ---
+    type_arr = np.array(types)
+    pool = CandidatePool(order[i] for i in np.flatnonzero((dist < radius - 1) & not_special & (type_arr != "ruins")).tolist())
+    _grow_blobs(world, types, index, pool, features.randint(3, 5), (4, 9), 20, None, "lake")
+    world.phase("lakes")
+
+    # --- Keys: away from the exit, apart from each other ---
+    type_arr = np.array(types)
+    valid_i = np.flatnonzero(not_special & ~np.isin(type_arr, ("wall", "lake", "ruins")))
+    far = valid_i[_hex_dist(coords[valid_i], *world.exit_pos) > radius * 0.55]
+    cand_i = far if len(far) else valid_i
+    key1 = features.choice(cand_i.tolist()); types[key1] = "key"
+    others = cand_i[cand_i != key1]
+    apart = others[_hex_dist(coords[others], *order[key1]) > radius * 0.4]
+    if not len(apart): apart = others
+    if len(apart): types[features.choice(apart.tolist())] = "key"
+    world.phase("keys")
+
+    # --- Tiles ---
+    tiles = {}
+    for (q, r), kind, variant in zip(order, types, variants):
+        tiles[(q, r)] = Tile(q, r, variant, kind)
+    world.tiles = tiles
+    world.phase("tiles")
+
+def _grow_blobs(world, types, index, pool, count, size_range, max_attempts, grows_into, kind):
+    # Same placement.grow_blobs as generate_forest_clusters / generate_lakes, over the type list
+    start = world.start_pos; exit_pos = world.exit_pos
+    def can_grow(nb):
+        i = index.get(nb)
+        return i is not None and nb != start and nb != exit_pos and (grows_into is None or types[i] in grows_into)
+    def paint(c): types[index[c]] = kind
+    grow_blobs(world.rng.features, pool, count, size_range, max_attempts, world.get_neighbors, can_grow, paint)
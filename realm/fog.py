@@ -0,0 +1,99 @@
+import collections
+import functools
+import random
+from . import bitset
+
+# ==========================================
+# FOG OF WAR
+# ==========================================
+# What the player sees from where they stand, and what they have seen. Both
+# are bitsets over tile ids, so a fog pass is one footprint lookup
+# (WorldMap.sight, memoized) and two int operations, never a sweep over the
+# map's tiles.
+
+def vision(tile_type, summit):
+    """(range, blocking terrain) for a player standing on tile_type."""
+    if summit: return 5, ("wall",)  # A paid-off mountain sees over everything but bedrock
+    return (1 if tile_type == "forest" else 2), ("wall", "forest", "lake")
+
+def footprint(topo, start, limit, blockers, disoriented=False):
+    """
+    Ids lit from tile id `start`: a BFS out to `limit` steps. Blockers are lit
+    but not seen past; in a sandstorm only the first ring is lit.
+    """
+    tile = topo.tile; adjacent = topo.adjacent
+    seen = {start}; lit = {start}; queue = collections.deque([(start, 0)])
+    while queue:
+        curr, dist = queue.popleft()
+        if curr != start and tile(curr).type in blockers: continue
+        if dist < limit:
+            for n in adjacent[curr]:
+                if n not in seen:
+                    seen.add(n)
+                    if not disoriented or dist < 1: lit.add(n); queue.append((n, dist + 1))
+    return lit
+
+class Exploration:
+    """
+    The player's view of one world as two bitsets over its tile ids (world
+    order, the same ids as the topology and the save encoding): visible is
+    what is in sight now, visited everything ever seen. Change them through
+    the methods: on_change(bits) hears which tiles any change touched.
+    """
+    __slots__ = ("visible", "visited", "on_change")
+
+    def __init__(self, visible=0, visited=0, on_change=None):
+        self.visible = visible; self.visited = visited; self.on_change = on_change
+
+    def _changed(self, visible, visited):
+        diff = (visible ^ self.visible) | (visited ^ self.visited)
+        self.visible = visible; self.visited = visited
+        if diff and self.on_change: self.on_change(diff)
+
+    def see(self, lit):
+        """The fog pass: exactly `lit` is in sight, and remembered from now on."""
+        self._changed(lit, self.visited | lit)
+
+    def reveal(self, bits):
+        """Marks tiles seen elsewhere (another client, a synced save) as visited and lit. Returns the new ones."""
+        new = bits & ~self.visited
+        self._changed(self.visible | new, self.visited | new)
+        return new
+
+# ==========================================
+# SANDSTORM BLINDNESS
+# ==========================================
+# Blindness masks memory instead of erasing it: the explored bits stay as
+# they are, and everything is hidden until a restore cursor walks past it.
+# The cursor steps through the tile ids in a seeded random order, so a
+# review only moves an int. The start tile and the tile the storm hit on are
+# never hidden. The save's lost_memory holds just
+#   {"epoch": n, "seed": s, "size": tiles, "keep": [tile ids], "cursor": restored}
+# while blind, and {"epoch": n} (or {}) once the last storm cleared.
+
+def blind(mem, size, keep=()):
+    """lost_memory for a new sandstorm on a world of `size` tiles, leaving the ids in `keep` remembered."""
+    return {"epoch": mem.get("epoch", 0) + 1, "seed": random.randrange(1 << 30), "size": size, "keep": sorted(set(keep)), "cursor": 0}
+
+def hideable(mem): return mem.get("size", 0) - len(mem.get("keep", ()))
+def is_blind(mem): return mem.get("cursor", 0) < hideable(mem)
+def remaining(mem): return max(0, hideable(mem) - mem.get("cursor", 0))
+def recovered(mem): return {"epoch": mem["epoch"]} if "epoch" in mem else {}
+
+def restore(mem, count):
+    """Gives back the next `count` tiles in restore order. Returns the new lost_memory."""
+    if not is_blind(mem): return mem
+    mem["cursor"] = min(hideable(mem), mem["cursor"] + count)
+    return mem if is_blind(mem) else recovered(mem)
+
+@functools.lru_cache(maxsize=4)
+def restore_order(seed, size, keep=()):
+    order = [i for i in range(size) if i not in keep] if keep else list(range(size)); random.Random(seed).shuffle(order)
+    return order
+
+@functools.lru_cache(maxsize=8)
+def _hidden(seed, size, keep, cursor): return bitset.from_indices(restore_order(seed, size, keep)[cursor:])
+
+def hidden(mem):
+    """Bitset of the tile ids whose memory the sandstorm still hides (0 when not blind)."""
+    return _hidden(mem["seed"], mem["size"], tuple(mem.get("keep", ())), mem["cursor"]) if is_blind(mem) else 0
@@ -0,0 +1,58 @@
+from .topology import hex_distance
+
+# ==========================================
+# FEATURE PLACEMENT
+# ==========================================
+# Shared by both world generators (world.py and fastgen.py). Each helper
+# makes the same RNG calls, in the same order, as the loops it replaced,
+# (on the world's own random.Random), so generated worlds are unchanged.
+# Only the bookkeeping around those calls got cheaper.
+
+class HexBuckets:
+    """
+    Spatial hash of placed features in square axial cells of side `radius`.
+    Two tiles within `radius` hexes of each other differ by at most `radius`
+    in q and in r, so a query only has to look at the 3x3 cells around it.
+    """
+    def __init__(self, radius):
+        self.radius = radius; self.cell = max(1, radius); self.cells = {}
+
+    def add(self, c): self.cells.setdefault((c[0] // self.cell, c[1] // self.cell), []).append(c)
+
+    def any_within(self, c):
+        cq = c[0] // self.cell; cr = c[1] // self.cell
+        for i in (cq - 1, cq, cq + 1):
+            for j in (cr - 1, cr, cr + 1):
+                for p in self.cells.get((i, j), ()):
+                    if hex_distance(c, p) <= self.radius: return True
+        return False
+
+class CandidatePool:
+    """Ordered candidates for rng.choice, with set membership and batched removal."""
+    def __init__(self, items):
+        self.items = list(items); self.members = set(self.items)
+
+    def __len__(self): return len(self.items)
+    def __contains__(self, c): return c in self.members
+    def choice(self, rng): return rng.choice(self.items)
+
+    def discard_all(self, cs):
+        # One order-preserving pass per batch instead of a list.remove() per tile
+        gone = self.members.intersection(cs)
+        if gone: self.members -= gone; self.items = [c for c in self.items if c not in gone]
+
+def grow_blobs(rng, pool, count, size_range, max_attempts, neighbors, can_grow, paint):
+    """
+    Seeds `count` blobs from `pool` and grows each by random walk from its
+    members into tiles `can_grow` accepts; `paint` is called per blob tile.
+    """
+    for _ in range(count):
+        if not pool: break
+        seed = pool.choice(rng); blob_size = rng.randint(*size_range); blob = {seed}; attempts = 0
+        while len(blob) < blob_size and attempts < max_attempts:
+            # list(blob) keeps the set's draw order; a blob is at most a dozen tiles
+            attempts += 1; source = rng.choice(list(blob)); nbs = neighbors(*source); rng.shuffle(nbs)
+            for n in nbs:
+                if n not in blob and can_grow(n): blob.add(n); break
+        for c in blob: paint(c)
+        pool.discard_all(blob)
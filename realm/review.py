@@ -0,0 +1,127 @@
+import math
+import random
+from . import fog
+from .world import SavedWorld
+
+# ==========================================
+# REVIEW EFFECTS
+# ==========================================
+# What one answered card does to a save. Expects a migrated save (see
+# schema.py): every field present, lost_memory a dict, radar_targets a list.
+# Sandstorm memory is a mask with a restore cursor (see fog.py), so giving
+# tiles back never touches the world.
+
+RUIN_REVIEWS = 500
+WAGER_REVIEWS = 200
+WAGER_TARGET = 90.0
+WAGER_PRIZE = 500
+SANDSTORM_REVIEWS = 300
+RESTORE_ALL = 999999
+
+# (debt, flag, message) for debts that tick down on every review
+TICK_DEBTS = (
+    ("trap_debt", "is_trapped", "Trap disabled."),
+    ("climb_debt", "is_climbing", "Summit reached."),
+    ("burn_debt", "is_burned", "Flames extinguished."),
+)
+
+def complete_ruin(d):
+    """
+    Marks the active ruin deciphered and pings one key/exit the player has not
+    visited yet. Returns (new target or None, SavedWorld or None).
+    """
+    d["ruin_active"] = False; d["ruin_progress"] = 0
+    curr_loc = d["current_ruin_location"]
+    if curr_loc:
+        if curr_loc not in d["completed_ruins"]: d["completed_ruins"].append(curr_loc)
+        d["current_ruin_location"] = None
+
+    world = SavedWorld.of(d)
+    pings = d["radar_targets"]
+    possible = []; hidden = fog.hidden(d["lost_memory"])
+    for i in (world.find_types("key", "exit") if world else []):
+        # FIX: Use 'visited' to ignore keys we found but walked away from (and don't remember through a sandstorm)
+        if not world.get("visited", i) or hidden >> i & 1:
+            k = world.key(i)
+            if k not in pings: possible.append(k)
+    if not possible: return None, world
+    target = random.choice(possible)
+    pings.append(target)
+    return target, world
+
+def restore_memory(d, count):
+    """Moves the sandstorm's restore cursor `count` tiles on. O(1): only lost_memory changes."""
+    d["lost_memory"] = fog.restore(d["lost_memory"], count)
+
+def apply_review(d, ease, time_taken):
+    """
+    Applies one answered card to `d` in place. `time_taken` is only called
+    while frozen. Returns ([(tooltip text, period or None)], SavedWorld or None).
+    """
+    notes = []; world = None
+
+    # --- 1. CURRENCY ---
+    if ease > 1: d["currency"] += 5
+
+    # --- 2. ARCHIVE / RUIN LOGIC (Multi-Ping Support) ---
+    if d["ruin_active"]:
+        d["ruin_progress"] += 1
+        if d["ruin_progress"] >= RUIN_REVIEWS:
+            target, world = complete_ruin(d)
+            if target: notes.append((f"Archive Deciphered! New signal at {target}.", 4000))
+            else: notes.append(("Archive Deciphered! No unknown signals remain.", 4000))
+        elif d["ruin_progress"] % 50 == 0:
+            notes.append((f"Archive Progress: {d['ruin_progress']}/{RUIN_REVIEWS}", None))
+
+    # --- 3. WAGER LOGIC ---
+    if d["wager_active"]:
+        d["wager_progress"] += 1
+        if ease > 1: d["wager_correct"] += 1
+        if d["wager_progress"] >= WAGER_REVIEWS:
+            retention = (d["wager_correct"] / float(WAGER_REVIEWS)) * 100.0
+            if retention >= WAGER_TARGET:
+                d["currency"] += WAGER_PRIZE
+                notes.append((f"WAGER WON! {retention:.1f}% (+{WAGER_PRIZE} Coins)", 5000))
+            else:
+                notes.append((f"WAGER LOST. {retention:.1f}%", 5000))
+            d["wager_active"] = False; d["wager_progress"] = 0; d["wager_correct"] = 0
+
+    # --- 4. DEBT REDUCTION (Clears flags immediately) ---
+    # Freeze (Requires answering quickly < 5s)
+    if d["freeze_debt"] > 0 and time_taken() < 5000:
+        d["freeze_debt"] -= 1
+        if d["freeze_debt"] <= 0:
+            d["freeze_debt"] = 0; d["is_frozen"] = False
+            notes.append(("Thawed! You can move again.", None))
+
+    for debt, flag, msg in TICK_DEBTS:
+        if d[debt] > 0:
+            d[debt] -= 1
+            if d[debt] <= 0:
+                d[debt] = 0; d[flag] = False
+                notes.append((msg, None))
+
+    # Rockslide (Quality Check)
+    if d["rock_debt"] > 0:
+        if ease >= 2:
+            d["rock_debt"] -= 1
+            if d["rock_debt"] <= 0:
+                d["rock_debt"] = 0; d["is_buried"] = False
+                notes.append(("Dug out! Path is clear.", None))
+        else:
+            d["rock_debt"] += 5
+            notes.append(("Mistake! Rocks slide back (+5)", None))
+
+    # --- 5. SANDSTORM / DISORIENTATION ---
+    if d["disorientation_debt"] > 0:
+        d["disorientation_debt"] -= 1
+        if fog.is_blind(d["lost_memory"]):
+            if d["disorientation_debt"] <= 0: count = RESTORE_ALL
+            # Proportional restore: with 300 debt and 300 tiles, one tile per review
+            else: count = max(1, math.ceil(fog.remaining(d["lost_memory"]) / d["disorientation_debt"]))
+            restore_memory(d, count)
+        if d["disorientation_debt"] <= 0:
+            d["disorientation_debt"] = 0; d["is_disoriented"] = False
+            notes.append(("Vision fully restored!", None))
+
+    return notes, world
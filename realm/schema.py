@@ -0,0 +1,94 @@
+import copy
+import math
+from . import fog
+from .review import SANDSTORM_REVIEWS
+from .world import WorldMap, SavedWorld
+
+# ==========================================
+# SAVE SCHEMA
+# ==========================================
+# Saves written before versioning are schema 1: fields may be missing, and
+# lost_memory / radar_targets come in whatever shape the release of the day
+# wrote. migrate() upgrades a save once when it is loaded, so everything past
+# load can index fields directly and assume one shape per field:
+#   lost_memory:   {} or {"epoch": n[, "seed", "size", "cursor"]} (fog.py)
+#   radar_targets: ["q,r", ...]
+#   world:         encoded (columnar / seed) world, never legacy tile dicts
+
+SCHEMA_VERSION = 3
+
+# Every field the game reads, with the value a fresh save starts from
+DEFAULTS = {
+    "username": "", "category": "Other", "stats": {"w": 0, "l": 0}, "in_match": False,
+    "currency": 0, "cold_stacks": 0, "has_key": False, "opponent_visible": False,
+    "is_frozen": False, "freeze_debt": 0,
+    "is_trapped": False, "trap_debt": 0,
+    "is_buried": False, "rock_debt": 0,
+    "is_climbing": False, "climb_debt": 0,
+    "is_burned": False, "burn_debt": 0,
+    "is_disoriented": False, "disorientation_debt": 0, "lost_memory": {},
+    "ruin_active": False, "ruin_progress": 0, "current_ruin_location": None, "completed_ruins": [],
+    "radar_targets": [],
+    "wager_active": False, "wager_progress": 0, "wager_correct": 0,
+}
+
+def coord_key(value):
+    """"q,r" for any coordinate spelling older saves used ("(q, r)", [q, r], "q, r"), else None."""
+    if isinstance(value, (list, tuple)) and len(value) == 2: return f"{int(value[0])},{int(value[1])}"
+    text = str(value).replace("(", "").replace(")", "").replace(" ", "")
+    parts = text.split(",")
+    if len(parts) != 2: return None
+    try: return f"{int(parts[0])},{int(parts[1])}"
+    except ValueError: return None
+
+def _v1_to_v2(d):
+    # Sandstorm memory: the legacy list only remembered visited coordinates
+    mem = d.get("lost_memory")
+    if isinstance(mem, list): mem = {coord_key(c): {"vis": False, "vst": True} for c in mem if coord_key(c)}
+    elif isinstance(mem, dict):
+        mem = {coord_key(c): {"vis": bool(s.get("vis", False)), "vst": bool(s.get("vst", False))}
+               for c, s in mem.items() if coord_key(c) and isinstance(s, dict)}
+    else: mem = {}
+    d["lost_memory"] = mem
+
+    # Radar: a single string, or a list of differently spelled coordinates
+    targets = d.get("radar_targets")
+    if targets is None: targets = []
+    elif isinstance(targets, (str, tuple)): targets = [targets]
+    normalized = []
+    for t in targets:
+        k = coord_key(t)
+        if k and k not in normalized: normalized.append(k)
+    d["radar_targets"] = normalized
+
+    # Legacy tile-dict worlds become the compact encoding
+    w = d.get("world")
+    if isinstance(w, dict) and "format" not in w and "tiles" in w: d["world"] = WorldMap.from_dict(w).to_dict()
+
+def _v2_to_v3(d):
+    # Sandstorm memory was a per-tile copy, erased from the world: put it back
+    # and hide it behind a restore mask as far along as the remaining debt
+    mem = d.get("lost_memory") or {}
+    world = SavedWorld.of(d) if mem else None
+    if not world: d["lost_memory"] = {}; return
+    for k, state in mem.items():
+        i = world.index.get(k)
+        if i is not None: world.set("visible", i, state["vis"]); world.set("visited", i, state["vst"])
+    world.commit()
+    # The old snapshot never held the start tile; the position the storm hit on isn't saved
+    start = world.index.get("{},{}".format(*world.static["start_pos"]))
+    mem = fog.blind({}, len(world.coords), () if start is None else (start,)); debt = min(d.get("disorientation_debt", 0), SANDSTORM_REVIEWS)
+    d["lost_memory"] = fog.restore(mem, fog.hideable(mem) - math.ceil(fog.hideable(mem) * debt / SANDSTORM_REVIEWS))
+
+# MIGRATIONS[v - 1] upgrades schema v to v + 1
+MIGRATIONS = [_v1_to_v2, _v2_to_v3]
+
+def migrate(d):
+    """Upgrades a save dict in place to SCHEMA_VERSION. Returns True if it changed."""
+    version = d.get("schema_version", 1)
+    if version >= SCHEMA_VERSION: return False
+    for step in MIGRATIONS[version - 1:]: step(d)
+    for k, v in DEFAULTS.items():
+        if k not in d: d[k] = copy.deepcopy(v)
+    d["schema_version"] = SCHEMA_VERSION
+    return True
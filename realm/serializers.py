@@ -0,0 +1,67 @@
+import json
+import zlib
+
+try: import orjson
+except ImportError: orjson = None
+try: import msgpack
+except ImportError: msgpack = None
+
+# ==========================================
+# SAVE FILE SERIALIZERS
+# ==========================================
+# Base snapshots start with a one-line header naming the codec that wrote
+# them (and whether the payload is zlib-compressed), so a file written by
+# any codec loads under any configuration that has that codec installed.
+# Untagged files are the plain JSON every earlier release wrote.
+#
+#   b"REALM json\n{...}"   b"REALM orjson zlib\n<deflate>"   b"REALM msgpack\n<bytes>"
+#
+# Journal lines and fingerprints always stay JSON text (see dump_text).
+
+MAGIC = b"REALM"
+COMPACT_SEPARATORS = (",", ":")
+COMPRESS_MIN_BYTES = 4096  # Smaller payloads don't win enough to pay for zlib
+
+def _json_dumps(obj): return json.dumps(obj, separators=COMPACT_SEPARATORS).encode("utf-8")
+def _json_loads(raw): return json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+
+CODECS = {"json": (_json_dumps, _json_loads)}
+if orjson: CODECS["orjson"] = (orjson.dumps, orjson.loads)
+if msgpack: CODECS["msgpack"] = (lambda obj: msgpack.packb(obj, use_bin_type=True),
+                                 lambda raw: msgpack.unpackb(raw, raw=False, strict_map_key=False))
+
+# Fastest available first
+PREFERRED = [c for c in ("orjson", "msgpack", "json") if c in CODECS]
+
+settings = {"codec": PREFERRED[0], "compress": False}
+
+def configure(codec=None, compress=False):
+    """Picks the codec new snapshots are written with ("auto"/None = fastest installed)."""
+    if codec in (None, "auto"): codec = PREFERRED[0]
+    elif codec not in CODECS:
+        print(f"Realm: save codec '{codec}' is not installed, using {PREFERRED[0]}"); codec = PREFERRED[0]
+    settings["codec"] = codec; settings["compress"] = bool(compress)
+
+def dumps(obj, codec=None, compress=None):
+    codec = codec or settings["codec"]
+    compress = settings["compress"] if compress is None else compress
+    payload = CODECS[codec][0](obj); tags = [codec]
+    if compress and len(payload) >= COMPRESS_MIN_BYTES: payload = zlib.compress(payload, 6); tags.append("zlib")
+    return MAGIC + b" " + " ".join(tags).encode("ascii") + b"\n" + payload
+
+def loads(raw):
+    if not raw.startswith(MAGIC): return _json_loads(raw)  # Untagged legacy JSON
+    header, _, payload = raw.partition(b"\n")
+    tags = header.decode("ascii").split()[1:]
+    codec = tags[0]
+    if codec not in CODECS: raise ValueError(f"Save was written with '{codec}', which is not installed")
+    if "zlib" in tags: payload = zlib.decompress(payload)
+    return CODECS[codec][1](payload)
+
+# --- JSON text for journal lines and fingerprints ---
+if orjson:
+    def dump_text(obj): return orjson.dumps(obj).decode("utf-8")
+    load_text = orjson.loads
+else:
+    def dump_text(obj): return json.dumps(obj, separators=COMPACT_SEPARATORS)
+    load_text = json.loads
@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import time
+from . import bitset, serializers
+from .storage import JournalStore, _dump, _stat, _stores, get_store
+from .world import WORLD_FLAGS, WORLD_FORMAT_SEED, static_index
+
+# ==========================================
+# SQLITE SAVE STORE
+# ==========================================
+# Optional backend with the same load/save interface as JournalStore, in a
+# WAL-mode database in the profile folder. Deltas are computed exactly like
+# the journal's; instead of appending a line, each one becomes a single
+# transaction of the few UPDATEs it needs (a review is usually one row in
+# `player`, plus a handful of `tiles` rows when a sandstorm memory comes back).
+#
+#   player:  scalar player state, one JSON value per key
+#   world:   world header (format, seed, level, ...), one JSON value per key
+#   tiles:   per-tile mutable state keyed by (q, r); idx is the column index
+#   traps:   trap owner / cluster id per tile
+#   matches: finished-match history
+
+SQLITE_SAVE_NAME = "realm_battle.db"
+
+# Parts of an encoded world that live in `tiles` / `traps` instead of `world`
+TILE_KEYS = WORLD_FLAGS + ("traps", "trap_groups", "cost")
+TRAP_COLUMNS = {"traps": "owner", "trap_groups": "group_id"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS player (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS world (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tiles (
+    q INTEGER NOT NULL, r INTEGER NOT NULL, idx INTEGER NOT NULL UNIQUE,
+    visible INTEGER NOT NULL DEFAULT 0, visited INTEGER NOT NULL DEFAULT 0, locked INTEGER NOT NULL DEFAULT 0,
+    cost INTEGER,
+    PRIMARY KEY (q, r)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS traps (
+    q INTEGER NOT NULL, r INTEGER NOT NULL, owner TEXT, group_id TEXT,
+    PRIMARY KEY (q, r)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS traps_group ON traps (group_id);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, seed INTEGER, result TEXT NOT NULL, finished_at REAL NOT NULL
+);
+"""
+
+def _encoded(world): return isinstance(world, dict) and "format" in world
+def _opt(v): return None if v is None else _dump(v)
+
+def _coords(world):
+    if world["format"] == WORLD_FORMAT_SEED: return static_index(world["seed"], world["level"], world["gen"])[0]
+    return list(zip(world["q"], world["r"]))
+
+class SqliteStore(JournalStore):
+    def __init__(self, path, legacy_path=None):
+        super().__init__(path)
+        self.legacy_path = legacy_path  # JSON save imported the first time the database is empty
+        self.conn = None
+
+    def connect(self):
+        # One connection, only ever used under io_lock (main thread or the save writer)
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL"); self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def signature(self): return (_stat(self.path), _stat(self.path + "-wal"))
+    def watch_paths(self): return [self.path, self.path + "-wal"]
+
+    # --- Reading ---
+    def read(self):
+        conn = self.connect()
+        if self.legacy_path and os.path.exists(self.legacy_path) and not conn.execute("SELECT 1 FROM player LIMIT 1").fetchone():
+            self.compact(get_store(self.legacy_path).load())
+        sig = self.signature()
+        data = {k: serializers.load_text(v) for k, v in conn.execute("SELECT key, value FROM player")}
+        header = {k: serializers.load_text(v) for k, v in conn.execute("SELECT key, value FROM world")}
+        if header: data["world"] = self.read_world(conn, header)
+        self.remember(data)
+        with self.lock: self.cached = data; self.sig = sig
+        return data
+
+    @staticmethod
+    def read_world(conn, world):
+        # Tile rows are streamed straight into the bitsets/sparse maps of the encoded world
+        visible = visited = locked = 0; costs = {}; n = 0
+        for idx, vis, vst, lck, cost in conn.execute("SELECT idx, visible, visited, locked, cost FROM tiles"):
+            if vis: visible |= 1 << idx
+            if vst: visited |= 1 << idx
+            if lck: locked |= 1 << idx
+            if cost is not None: costs[str(idx)] = cost
+            n = max(n, idx + 1)
+        world["visible"] = bitset.encode(visible, n); world["visited"] = bitset.encode(visited, n); world["locked"] = bitset.encode(locked, n)
+        world["cost"] = costs; world["traps"] = {}; world["trap_groups"] = {}
+        for idx, owner, group_id in conn.execute("SELECT t.idx, p.owner, p.group_id FROM traps p JOIN tiles t USING (q, r)"):
+            if owner is not None: world["traps"][str(idx)] = serializers.load_text(owner)
+            if group_id is not None: world["trap_groups"][str(idx)] = serializers.load_text(group_id)
+        return world
+
+    # --- Writing ---
+    def write(self, data):
+        if not self.loaded: return self.compact(data)
+        delta, texts = self.diff(data)
+        if not delta: return
+        conn = self.connect()
+        with conn:
+            conn.execute("BEGIN")
+            for k, v in delta.get("set", {}).items():
+                if k == "world": self.put_world(conn, v)
+                else: conn.execute("INSERT OR REPLACE INTO player VALUES (?, ?)", (k, _dump(v)))
+            for k in delta.get("del", []):
+                if k == "world": self.put_world(conn, None)
+                else: conn.execute("DELETE FROM player WHERE key = ?", (k,))
+            if "world" in delta: self.patch_world(conn, data["world"], delta["world"])
+        self.advance(data, delta, texts)
+
+    def compact(self, data):
+        conn = self.connect()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM player")
+            conn.executemany("INSERT INTO player VALUES (?, ?)", [(k, _dump(v)) for k, v in data.items() if k != "world"])
+            self.put_world(conn, data.get("world"))
+        self.remember(data)
+
+    def put_world(self, conn, world):
+        conn.execute("DELETE FROM world"); conn.execute("DELETE FROM tiles"); conn.execute("DELETE FROM traps")
+        conn.execute("DELETE FROM player WHERE key = 'world'")
+        if world is None: return
+        # Anything that isn't an encoded world (legacy tile dicts, {} between matches) is kept as one value
+        if not _encoded(world): return conn.execute("INSERT INTO player VALUES ('world', ?)", (_dump(world),))
+        conn.executemany("INSERT INTO world VALUES (?, ?)", [(k, _dump(v)) for k, v in world.items() if k not in TILE_KEYS])
+        coords = _coords(world); bits = {f: bitset.decode(world[f]) for f in WORLD_FLAGS}; costs = world["cost"]
+        conn.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         ((q, r, i, bits["visible"] >> i & 1, bits["visited"] >> i & 1, bits["locked"] >> i & 1, costs.get(str(i)))
+                          for i, (q, r) in enumerate(coords)))
+        owners = world["traps"]; groups = world["trap_groups"]
+        conn.executemany("INSERT INTO traps VALUES (?, ?, ?, ?)",
+                         [(*coords[int(k)], _opt(owners.get(k)), _opt(groups.get(k))) for k in set(owners) | set(groups)])
+
+    def patch_world(self, conn, world, wd):
+        sets = wd.get("set", {}); dels = wd.get("del", [])
+        if any(k in TILE_KEYS for k in (*sets, *dels)) or any(k != "cost" and k not in TRAP_COLUMNS for k in wd.get("patch", {})):
+            # A replaced bitset/sparse map, or one we don't have columns for: rewrite the world
+            return self.put_world(conn, world)
+        for k, v in sets.items(): conn.execute("INSERT OR REPLACE INTO world VALUES (?, ?)", (k, _dump(v)))
+        for k in dels: conn.execute("DELETE FROM world WHERE key = ?", (k,))
+        for flag, b in wd.get("bits", {}).items():
+            conn.executemany(f"UPDATE tiles SET {flag} = 1 WHERE idx = ?", [(i,) for i in b.get("on", [])])
+            conn.executemany(f"UPDATE tiles SET {flag} = 0 WHERE idx = ?", [(i,) for i in b.get("off", [])])
+        for k, p in wd.get("patch", {}).items():
+            sets = p.get("set", {}); dels = p.get("del", [])
+            if k == "cost":
+                conn.executemany("UPDATE tiles SET cost = ? WHERE idx = ?", [(v, int(i)) for i, v in sets.items()])
+                conn.executemany("UPDATE tiles SET cost = NULL WHERE idx = ?", [(int(i),) for i in dels])
+                continue
+            col = TRAP_COLUMNS[k]
+            conn.executemany(f"INSERT INTO traps (q, r, {col}) SELECT q, r, ? FROM tiles WHERE idx = ? "
+                             f"ON CONFLICT (q, r) DO UPDATE SET {col} = excluded.{col}", [(_dump(v), int(i)) for i, v in sets.items()])
+            conn.executemany(f"UPDATE traps SET {col} = NULL WHERE (q, r) = (SELECT q, r FROM tiles WHERE idx = ?)", [(int(i),) for i in dels])
+        conn.execute("DELETE FROM traps WHERE owner IS NULL AND group_id IS NULL")
+
+    # --- Match history ---
+    def record_match(self, seed, result):
+        with self.io_lock:
+            conn = self.connect()
+            with conn: conn.execute("INSERT INTO matches (seed, result, finished_at) VALUES (?, ?, ?)", (seed, result, time.time()))
+
+    def delete(self):
+        with self.io_lock:
+            with self.lock:
+                self.pending = None; self.cached = None; self.sig = None
+            if self.conn is not None: self.conn.close(); self.conn = None
+            for p in (self.path, self.path + "-wal", self.path + "-shm"):
+                if os.path.exists(p): os.remove(p)
+            self.loaded = False; self.keys = {}; self.world = None
+        # A factory reset must not re-import the old JSON save on the next load
+        if self.legacy_path: get_store(self.legacy_path).delete()
+
+def get_sqlite_store(path, legacy_path=None):
+    store = _stores.get(path)
+    if store is None: store = _stores[path] = SqliteStore(path, legacy_path)
+    return store
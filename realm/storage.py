@@ -0,0 +1,268 @@
+import copy
+import os
+import threading
+import time
+from . import bitset, serializers
+from .world import WORLD_FLAGS
+
+# ==========================================
+# JOURNALED SAVE FILE
+# ==========================================
+# A save is a base snapshot (the old lumina_save_<profile>.json path, so legacy
+# files load unchanged; new ones are header-tagged, see serializers.py) plus an append-only "<path>.journal" of
+# small deltas. Each save only appends what changed since the last write;
+# once the journal grows past the threshold it is folded into a new base.
+#
+# Delta line: {"set": {key: value}, "del": [key], "world": world_delta}
+# world_delta: {"set": {...}, "del": [...], "bits": {flag: {"on": [tile index], "off": [tile index]}},
+#               "patch": {sparse_map: {"set": {...}, "del": [...]}}}
+# Every delta states values, never toggles, so replaying a journal that is
+# already folded into the base (a crash mid-compaction) changes nothing.
+
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_COMPACT_BYTES = 256 * 1024
+SAVE_DEBOUNCE = 0.3  # Seconds a burst of saves is coalesced into one write
+
+_dump = serializers.dump_text
+
+def _stat(path):
+    try: st = os.stat(path)
+    except OSError: return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _copy(v): return list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v
+
+class JournalStore:
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.journal_bytes = 0
+        # Fingerprint of what is currently on disk (base + journal).
+        # world is a shallow copy of an encoded world, or its text for any other shape.
+        self.loaded = False; self.keys = {}; self.world = None
+        # Parsed state kept while (mtime, size) of base and journal are unchanged.
+        # Never handed out: load() returns a private copy, save() stores its own.
+        self.cached = None; self.sig = None
+        # Write-behind: `pending` is a snapshot waiting for the writer thread,
+        # `inflight` is set while one is being written. `lock` guards the
+        # bookkeeping and is never held across file reads/writes; `io_lock`
+        # serializes those.
+        self.pending = None; self.inflight = False
+        self.lock = threading.Lock(); self.io_lock = threading.Lock()
+
+    def signature(self): return (_stat(self.path), _stat(self.journal_path))
+    def watch_paths(self): return [self.path, self.journal_path]
+
+    def changed_externally(self):
+        """True if the files no longer match what this process last read or wrote."""
+        with self.lock:
+            if self.pending is not None or self.inflight or self.sig is None: return False
+            return self.signature() != self.sig
+
+    # --- Reading ---
+    def load(self):
+        """The current save as a dict the caller owns (a copy of the cache, so callers on other threads can't race on it)."""
+        return copy.deepcopy(self.current())
+
+    def current(self):
+        with self.lock:
+            # Unwritten saves are newer than the disk, so the cache stays authoritative
+            if self.cached is not None and (self.pending is not None or self.inflight or self.signature() == self.sig):
+                return self.cached
+        with self.io_lock:
+            with self.lock:
+                if self.cached is not None and self.signature() == self.sig: return self.cached
+                self.cached = None
+            return self.read()
+
+    def read(self):
+        sig = self.signature()
+        with open(self.path, "rb") as f: data = serializers.loads(f.read())
+        self.journal_bytes = 0
+        if os.path.exists(self.journal_path):
+            torn = False
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try: delta = serializers.load_text(line) if line.endswith(b"\n") else None
+                    except ValueError: delta = None
+                    if delta is None: torn = True; break  # Torn tail from a crash mid-append
+                    self.journal_bytes += len(line)
+                    self.apply(data, delta)
+            # Cut the torn bytes off, or the next append would land on the broken line and be lost with it
+            if torn: os.truncate(self.journal_path, self.journal_bytes)
+        self.remember(data)
+        with self.lock: self.cached = data; self.sig = sig
+        return data
+
+    @staticmethod
+    def apply(data, delta):
+        for k, v in delta.get("set", {}).items(): data[k] = v
+        for k in delta.get("del", []): data.pop(k, None)
+        wd = delta.get("world")
+        if wd:
+            w = data["world"]
+            for k, v in wd.get("set", {}).items(): w[k] = v
+            for k in wd.get("del", []): w.pop(k, None)
+            for k, b in wd.get("bits", {}).items(): w[k] = bitset.assign(w[k], b.get("on", []), b.get("off", []))
+            for k, idxs in wd.get("flip", {}).items(): w[k] = bitset.flip(w[k], idxs)  # Old journals
+            for k, p in wd.get("patch", {}).items():
+                m = w.setdefault(k, {}); m.update(p.get("set", {}))
+                for kk in p.get("del", []): m.pop(kk, None)
+
+    # --- Fingerprint ---
+    def remember(self, data):
+        self.loaded = True
+        self.keys = {k: _dump(v) for k, v in data.items() if k != "world"}
+        self.remember_world(data.get("world"))
+
+    def remember_world(self, world):
+        if world is None: self.world = None
+        elif isinstance(world, dict) and "format" in world: self.world = {k: _copy(v) for k, v in world.items()}
+        else: self.world = _dump(world)
+
+    def diff_world(self, world):
+        """Delta between the persisted world and `world`, or None if it must be rewritten whole."""
+        old = self.world
+        if not (isinstance(old, dict) and isinstance(world, dict) and "format" in world):
+            return {} if _dump(world) == old else None
+        if world.get("format") != old.get("format") or world.get("seed") != old.get("seed"): return None
+        sets = {}; bits = {}; patches = {}
+        for k, v in world.items():
+            ov = old.get(k)
+            if ov == v: continue
+            if k in WORLD_FLAGS and isinstance(ov, str) and isinstance(v, str) and len(ov) == len(v):
+                on, off = bitset.changed(ov, v)
+                bits[k] = {bk: bv for bk, bv in (("on", on), ("off", off)) if bv}
+            elif isinstance(v, dict) and isinstance(ov, dict):
+                p = {"set": {kk: vv for kk, vv in v.items() if kk not in ov or ov[kk] != vv},
+                     "del": [kk for kk in ov if kk not in v]}
+                patches[k] = {pk: pv for pk, pv in p.items() if pv}
+            else: sets[k] = v
+        wd = {}
+        if sets: wd["set"] = sets
+        removed = [k for k in old if k not in world]
+        if removed: wd["del"] = removed
+        if bits: wd["bits"] = bits
+        if patches: wd["patch"] = patches
+        return wd
+
+    def diff(self, data):
+        """Returns the delta from the on-disk state to `data`, plus the new key fingerprints."""
+        delta = {}; changed = {}; texts = {}
+        for k, v in data.items():
+            if k == "world": continue
+            text = _dump(v)
+            if self.keys.get(k) != text: changed[k] = v; texts[k] = text
+        removed = [k for k in self.keys if k not in data]
+
+        if "world" in data:
+            wd = self.diff_world(data["world"])
+            if wd is None: changed["world"] = data["world"]
+            elif wd: delta["world"] = wd
+        elif self.world is not None:
+            removed.append("world")
+
+        if changed: delta["set"] = changed
+        if removed: delta["del"] = removed
+        return delta, texts
+
+    def advance(self, data, delta, texts):
+        # Update the fingerprint in O(delta) instead of re-hashing the whole save
+        self.keys.update(texts)
+        for k in delta.get("del", []):
+            self.keys.pop(k, None)
+            if k == "world": self.world = None
+        if "world" in delta.get("set", {}): self.remember_world(data["world"])
+        wd = delta.get("world")
+        if wd:
+            w = data["world"]
+            for section in ("set", "bits", "patch"):
+                for k in wd.get(section, {}): self.world[k] = _copy(w[k])
+            for k in wd.get("del", []): self.world.pop(k, None)
+
+    # --- Writing ---
+    def save(self, data):
+        """Queues `data` for the writer thread; never touches the disk on the caller's thread."""
+        snapshot = copy.deepcopy(data)  # The caller keeps mutating `data` while the writer serializes
+        with self.lock: self.cached = snapshot; self.pending = snapshot  # Both only ever read from here on
+        _writer.schedule(self)
+
+    def flush(self):
+        """Writes any pending save now and waits for an in-flight one to land."""
+        self.write_pending()
+
+    def write_pending(self):
+        with self.io_lock:
+            with self.lock:
+                data = self.pending; self.pending = None
+                if data is None: return
+                self.inflight = True
+            try: self.write(data)
+            except Exception as e: print(f"Realm Save Error: {e}")
+            finally:
+                with self.lock: self.inflight = False; self.sig = self.signature()
+
+    def write(self, data):
+        if not self.loaded or not os.path.exists(self.path): return self.compact(data)
+        delta, texts = self.diff(data)
+        if not delta: return
+        line = (_dump(delta) + "\n").encode("utf-8")  # Bytes: journal_bytes is also read()'s truncation offset
+        with open(self.journal_path, "ab") as f: f.write(line); f.flush(); os.fsync(f.fileno())
+        self.journal_bytes += len(line)
+        self.advance(data, delta, texts)
+        if self.journal_bytes > JOURNAL_COMPACT_BYTES: self.compact(data)
+
+    def compact(self, data):
+        # Full rewrite goes through a temp file + os.replace so a crash never truncates the save
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(serializers.dumps(data)); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if os.path.exists(self.journal_path): os.remove(self.journal_path)
+        self.journal_bytes = 0
+        self.remember(data)
+
+    def record_match(self, seed, result):
+        pass  # Match history is only kept by the SQLite backend (sqlstore.py)
+
+    def delete(self):
+        with self.io_lock:
+            with self.lock:
+                self.pending = None; self.cached = None; self.sig = None
+            for p in (self.path, self.journal_path):
+                if os.path.exists(p): os.remove(p)
+            self.journal_bytes = 0; self.loaded = False; self.keys = {}; self.world = None
+
+class SaveWriter(threading.Thread):
+    """Single background thread that writes dirty stores, one write per debounce window."""
+    def __init__(self):
+        super().__init__(name="RealmSaveWriter", daemon=True)
+        self.cond = threading.Condition(); self.dirty = {}; self.running = False
+
+    def schedule(self, store):
+        with self.cond:
+            self.dirty[store.path] = store
+            if not self.running: self.running = True; self.start()
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.dirty: self.cond.wait()
+            time.sleep(SAVE_DEBOUNCE)
+            with self.cond:
+                stores = list(self.dirty.values()); self.dirty.clear()
+            for store in stores: store.write_pending()
+
+_writer = SaveWriter()
+
+# Process-wide: one store (and therefore one parsed cache) per save path
+_stores = {}
+
+def get_store(path):
+    store = _stores.get(path)
+    if store is None: store = _stores[path] = JournalStore(path)
+    return store
+
+def flush_all():
+    for store in list(_stores.values()): store.flush()
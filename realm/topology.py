@@ -0,0 +1,72 @@
+import functools
+
+# ==========================================
+# HEX TOPOLOGY
+# ==========================================
+# Built once per world (WorldMap.topology). Tiles get dense integer ids in
+# the order of world.tiles, so id i is also index i of the columnar save
+# encoding. Adjacency only lists tiles that exist, so walking the map never
+# probes the tiles dict for coordinates that fall off the edge. Tiles are
+# looked up by id on demand (tile()), so building the index doesn't build a
+# chunked world's tiles.
+
+# Axial neighbour offsets, in WorldMap.get_neighbors() order
+HEX_DIRECTIONS = ((1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1))
+
+def hex_distance(a, b):
+    dq = a[0] - b[0]; dr = a[1] - b[1]
+    return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
+@functools.lru_cache(maxsize=None)
+def ring_offsets(k):
+    """Offsets at exactly distance k, walked around the ring (one entry for k == 0)."""
+    if k == 0: return ((0, 0),)
+    q, r = -k, k  # HEX_DIRECTIONS[4] * k
+    out = []
+    for dq, dr in HEX_DIRECTIONS:
+        for _ in range(k): out.append((q, r)); q += dq; r += dr
+    return tuple(out)
+
+@functools.lru_cache(maxsize=None)
+def spiral_offsets(k):
+    """Offsets within distance k, ring by ring from the centre outwards."""
+    return tuple(o for i in range(k + 1) for o in ring_offsets(i))
+
+class HexTopology:
+    def __init__(self, tiles):
+        self.tiles = tiles  # The dict this was built from; WorldMap rebuilds when it is replaced
+        # Chunked tiles already carry a coordinate index; share it
+        self.coords = getattr(tiles, "coords", None) or list(tiles)
+        self.ids = getattr(tiles, "ids", None) or {c: i for i, c in enumerate(self.coords)}
+        ids = self.ids
+        # Flat neighbour table: slots 6*i .. 6*i+5 in HEX_DIRECTIONS order, -1 off the map
+        self.neighbor_table = [ids.get((q + dq, r + dr), -1) for q, r in self.coords for dq, dr in HEX_DIRECTIONS]
+        table = self.neighbor_table
+        self.adjacent = [tuple(n for n in table[6 * i:6 * i + 6] if n >= 0) for i in range(len(self.coords))]
+        self._dist_center = None; self._dists = None
+
+    def __len__(self): return len(self.coords)
+
+    def tile(self, i): return self.tiles[self.coords[i]]
+    def neighbor_ids(self, c):
+        i = self.ids.get(c)
+        return self.adjacent[i] if i is not None else ()
+    def is_adjacent(self, a, b): return b in self.ids and hex_distance(a, b) == 1
+
+    def ring(self, c, k):
+        """Ids of the existing tiles at exactly distance k from c."""
+        ids = self.ids; q, r = c
+        return [i for i in (ids.get((q + dq, r + dr)) for dq, dr in ring_offsets(k)) if i is not None]
+
+    def spiral(self, c, k):
+        """Ids of the existing tiles within distance k of c, nearest rings first."""
+        ids = self.ids; q, r = c
+        return [i for i in (ids.get((q + dq, r + dr)) for dq, dr in spiral_offsets(k)) if i is not None]
+
+    def distances_from(self, c):
+        """Hex distance from c to every tile, by id. The last centre is cached (it is usually the player)."""
+        if self._dist_center != c:
+            q, r = c
+            self._dists = [(abs(tq - q) + abs(tr - r) + abs(tq + tr - q - r)) // 2 for tq, tr in self.coords]
+            self._dist_center = c
+        return self._dists
@@ -0,0 +1,488 @@
+import random
+import math
+import collections
+import time
+import functools
+import hashlib
+import inspect
+from . import bitset, fastgen, fog, placement, topology, worldcache
+from .topology import HexTopology, HEX_DIRECTIONS, hex_distance
+from .placement import HexBuckets, CandidatePool, grow_blobs
+from .chunks import ChunkedTiles, ChunkIndex, chunk_of
+
+# --- GAME CONSTANTS ---
+BASE_MAP_SIZE = 350       
+LEVEL_GROWTH = 50         
+
+PALETTE = {
+    "plains":   "#8bc34a", 
+    "hills":    "#cddc39", 
+    "forest":   "#2d5a27", 
+    "dunes":    "#ffd54f", 
+    "swamp":    "#5d4037", 
+    "lake":     "#2980b9", 
+    "scrub":    "#8c9e5e", 
+    "ruins":    "#8e44ad", # Changed to purple for distinction
+    "tundra":   "#b2ebf2", 
+    "wasteland":"#2d3436", 
+    "volcanic": "#d84315", 
+    "mountain": "#95a5a6", 
+    "wall":     "#2d3436", 
+    "start":    "#55efc4", 
+    "exit":     "#f1c40f", 
+    "trap":     "#e74c3c",
+    "key":      "#00d2d3", 
+    "p0_hex":   "#0984e3", 
+    "p1_hex":   "#9b59b6", 
+}
+
+TERRAIN_CONFIG = {
+    "plains": {"cost": 20, "color": PALETTE["plains"], "name": "Plains", "desc": "Standard open terrain. Low movement cost with clear visibility."},
+    "hills": {"cost": 40, "color": PALETTE["hills"], "name": "Hills", "desc": "Uneven ground. Slightly higher coin cost to traverse."},
+    "forest": {"cost": 50, "color": PALETTE["forest"], "name": "Forest", "desc": "Dense canopy. Limits visibility over forest tiles and limits visibility to 1 while within."},
+    "dunes": {"cost": 40, "color": PALETTE["dunes"], "name": "Dunes", "desc": "Shifting sands. Causes Blindness: You forget your map. 300 Reviews to clear the sand from your eyes."},
+    "swamp": {"cost": 50, "color": PALETTE["swamp"], "name": "Bog", "desc": "Treacherous mud. 20% chance to sink and lose 50% of your current coins."},
+    "lake": {"cost": 0, "color": PALETTE["lake"], "name": "Lake", "desc": "Deep water. Impassable barrier that must be navigated around."}, 
+    "scrub": {"cost": 60, "color": PALETTE["scrub"], "name": "Scrub", "desc": "Dense, thorny brush. High movement cost that can be decreased by doing reviews quickly."},
+    "ruins": {"cost": 0, "color": PALETTE["ruins"], "name": "Ancient Ruins", "desc": "Mysterious structures. Study 500 cards here to reveal the location of a Key or the Artifact."},
+    "mountain": {"cost": 0, "color": PALETTE["mountain"], "name": "Mountain", "desc": "Blocks normal movement. Spend 100 reviews to Climb for massive vision."},
+    "tundra": {"cost": 100, "color": PALETTE["tundra"], "name": "Tundra", "desc": "Freezing winds. 33% chance to Freeze (Debt: 150 Speedy Reviews < 5s/card)."},
+    "wasteland":{"cost": 100, "color": PALETTE["wasteland"], "name": "Jagged Peaks", "desc": "Unstable cliffs. 33% chance of Rockslide (Debt: Achieve 100 Consistent High Quality Reviews)."},
+    "volcanic": {"cost": 100, "color": PALETTE["volcanic"], "name": "Volcanic", "desc": "Active magma. 33% chance to Burn (Debt: 200 Reviews)."},
+    "trap": {"cost": 0, "color": PALETTE["trap"], "name": "Trap", "desc": "Hidden mine. Stepping on an enemy trap triggers a 100 Review Lockdown."},
+    "wall": {"cost": 0, "color": PALETTE["wall"], "name": "Bedrock", "desc": "Indestructible solid rock barrier."},
+    "start": {"cost": 0, "color": PALETTE["start"], "name": "Base", "desc": "Your safe zone. Use the 'Recall' item to return here instantly."},
+    "exit": {"cost": 0, "color": PALETTE["exit"], "name": "Artifact", "desc": "The Objective. The first player to reach this Golden Tile wins the match."},
+    "key": {"cost": 0, "color": PALETTE["key"], "name": "Key", "desc": "Ancient Mechanism. Required to unlock the Artifact."}
+}
+
+
+# Encodings written by WorldMap.to_dict(). Dicts without a "format" key are
+# the legacy per-tile {"q,r": {...}} layout.
+WORLD_FORMAT_COLUMNS = 2  # Full columnar dump: terrain arrays + player state
+WORLD_FORMAT_SEED = 3     # Player state only; terrain is regenerated from seed/level
+WORLD_FLAGS = ("visible", "visited", "locked")
+SIGHT_CACHE_SIZE = 256  # Memoized vision footprints per world (WorldMap.sight)
+STATIC_KEYS = ("radius", "start_pos", "exit_pos", "legend", "q", "r", "type", "variant")
+
+# Bump whenever generate_world() produces different terrain for the same
+# seed/level. New worlds are built with GENERATOR_VERSION; seed-only saves
+# from any SUPPORTED_GENERATORS version still expand. Both players must build
+# the same version, so a bump ships with the server handing it out.
+GENERATOR_VERSION = 1
+SUPPORTED_GENERATORS = (1, 2)
+
+# Named RNG sub-streams a generator draws from (WorldRng). v1 backs them all
+# with one random.Random(seed), in the interleaved order that random.seed(seed)
+# always produced. v2 seeds each from (seed, name), so a change to one phase
+# doesn't reshuffle the others.
+RNG_STREAMS = ("layout", "variants", "biomes", "features")
+
+class WorldRng:
+    __slots__ = RNG_STREAMS
+    def __init__(self, seed, version=GENERATOR_VERSION):
+        shared = random.Random(seed) if version == 1 else None
+        for name in RNG_STREAMS: setattr(self, name, shared or random.Random(f"{seed}:{name}"))
+
+# Tiles store terrain as an index into TERRAIN_TYPES. Names are interned on
+# first use, so an unknown type from an old save still round-trips.
+TERRAIN_TYPES = list(TERRAIN_CONFIG)
+TERRAIN_IDS = {name: i for i, name in enumerate(TERRAIN_TYPES)}
+TERRAIN_COSTS = [TERRAIN_CONFIG[name]["cost"] for name in TERRAIN_TYPES]
+
+def terrain_id(name):
+    i = TERRAIN_IDS.get(name)
+    if i is None: i = TERRAIN_IDS[name] = len(TERRAIN_TYPES); TERRAIN_TYPES.append(name); TERRAIN_COSTS.append(0)
+    return i
+
+TILE_LOCKED = 1
+
+def _flag(bit):
+    def get(self): return bool(self._flags & bit)
+    def set(self, on): self._flags = self._flags | bit if on else self._flags & ~bit
+    return property(get, set)
+
+class Tile:
+    # A large map holds thousands of these: no per-instance __dict__, shared
+    # terrain metadata, and cost only stored when it differs from the terrain's.
+    # Whether a tile is in sight or explored lives in WorldMap.explore.
+    __slots__ = ("q", "r", "_kind", "_cost", "_flags", "variant", "trap_owner", "trap_group_id")
+
+    def __init__(self, q, r, variant=None, terrain=None):
+        self.q = q; self.r = r; self._kind = 0 if terrain is None else terrain_id(terrain); self._cost = None; self._flags = 0
+        # Only new tiles roll a variant; decoded ones pass theirs and leave the RNG alone
+        self.trap_owner = None; self.variant = random.randint(0, 100) if variant is None else variant
+        self.trap_group_id = None
+
+    @property
+    def type(self): return TERRAIN_TYPES[self._kind]
+    @type.setter
+    def type(self, name): self._kind = terrain_id(name)
+
+    @property
+    def cost(self): return TERRAIN_COSTS[self._kind] if self._cost is None else self._cost
+    @cost.setter
+    def cost(self, value): self._cost = None if value == TERRAIN_COSTS[self._kind] else value
+
+    is_locked = _flag(TILE_LOCKED)
+
+    def to_dict(self):
+        d = {
+            "q": self.q, "r": self.r, "type": self.type, "cost": self.cost,
+            "is_locked": self.is_locked, "trap_owner": self.trap_owner,
+            "variant": self.variant
+        }
+        if self.trap_group_id: d["trap_group_id"] = self.trap_group_id
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        t = cls(d["q"], d["r"]); t.type = d["type"]; t.cost = d["cost"]
+        t.is_locked = d.get("is_locked", False)
+        t.trap_owner = d.get("trap_owner")
+        t.variant = d.get("variant", 0)
+        t.trap_group_id = d.get("trap_group_id")
+        return t
+
+
+
+class WorldMap:
+    phase_times = None  # {phase: seconds} to have generate_world() time its phases (benchmarks/bench_worldgen.py)
+    _sight = None; _sight_for = None
+    def __init__(self, radius, level=1, generate=True, seed=None, generator=GENERATOR_VERSION):
+        self.radius = 0; self.level = level; self.tiles = {}; self.start_pos = (0, 0); self.exit_pos = None
+        self.seed = seed if seed else random.randint(100000, 999999)
+        self.generator = generator if generate else None  # None = terrain of unknown origin
+        self._topology = None; self.explore = fog.Exploration(on_change=self.mark_dirty)
+        self.chunk_versions = {}  # Chunk key -> render version, bumped by mark_dirty()
+        if generate: self.generate_world()
+    def to_dict(self, mode="seed"):
+        enc = self.columns()
+        if mode == "seed" and self.generator in SUPPORTED_GENERATORS:
+            # Terrain is a pure function of (seed, level, generator): persist only player state
+            enc = {k: v for k, v in enc.items() if k not in STATIC_KEYS}
+            enc["format"] = WORLD_FORMAT_SEED
+        return enc
+    def columns(self):
+        # Columnar encoding: parallel coordinate/type arrays, one bitset per
+        # flag and sparse maps keyed by tile index.
+        if isinstance(self.tiles, ChunkedTiles):
+            # Terrain never changes in play, so it is still the decoded layer; only built chunks need walking
+            layer = self.tiles.layer; legend, qs, rs, types, variants = (list(layer[k]) for k in ("legend", "q", "r", "type", "variant"))
+            locked, traps, groups, costs = self.tiles.player_state()
+            return self._encode(legend, qs, rs, types, variants, locked, traps, groups, costs)
+        legend = []; type_ids = {}; qs = []; rs = []; types = []; variants = []
+        locked = 0; traps = {}; groups = {}; costs = {}
+        for i, t in enumerate(self.tiles.values()):
+            tid = type_ids.get(t.type)
+            if tid is None: tid = type_ids[t.type] = len(legend); legend.append(t.type)
+            qs.append(t.q); rs.append(t.r); types.append(tid); variants.append(t.variant)
+            if t.is_locked: locked |= 1 << i
+            if t.trap_owner is not None: traps[str(i)] = t.trap_owner
+            if t.trap_group_id: groups[str(i)] = t.trap_group_id
+            if t.cost != TERRAIN_CONFIG.get(t.type, {}).get("cost"): costs[str(i)] = t.cost
+        return self._encode(legend, qs, rs, types, variants, locked, traps, groups, costs)
+    def _encode(self, legend, qs, rs, types, variants, locked, traps, groups, costs):
+        n = len(qs); visible = self.explore.visible; visited = self.explore.visited
+        return {"format": WORLD_FORMAT_COLUMNS, "gen": self.generator, "radius": self.radius, "level": self.level, "start_pos": list(self.start_pos), "exit_pos": list(self.exit_pos), "seed": self.seed,
+                "legend": legend, "q": qs, "r": rs, "type": types, "variant": variants,
+                "visible": bitset.encode(visible, n), "visited": bitset.encode(visited, n), "locked": bitset.encode(locked, n),
+                "traps": traps, "trap_groups": groups, "cost": costs}
+    @classmethod
+    def from_seed(cls, seed, level=1, generator=GENERATOR_VERSION):
+        """Unexplored world for (seed, level); the terrain comes from the world cache when it has it."""
+        return cls.from_dict({"format": WORLD_FORMAT_SEED, "gen": generator, "seed": seed, "level": level, **{f: "" for f in WORLD_FLAGS}})
+    @classmethod
+    def from_dict(cls, d):
+        seeded = d.get("format") == WORLD_FORMAT_SEED
+        if seeded: d = expand_seed_world(d)
+        w = cls(0, d["level"], False); w.radius = d["radius"]; w.start_pos = tuple(d["start_pos"]); w.exit_pos = tuple(d["exit_pos"]); w.seed = d.get("seed")
+        w.generator = d.get("gen")
+        if "format" not in d:
+            # Legacy: {"q,r": {full tile dict}}
+            for i, (k, v) in enumerate(d["tiles"].items()):
+                q, r = map(int, k.split(',')); w.tiles[(q, r)] = Tile.from_dict(v)
+                if v.get("visible"): w.explore.visible |= 1 << i
+                if v.get("visited"): w.explore.visited |= 1 << i
+        else:
+            # Tiles are built per chunk on first touch (see realm/chunks.py)
+            index = static_chunk_index(w.seed, w.level, w.generator) if seeded else None
+            w.tiles = ChunkedTiles(d, d, index); w.explore = fog.Exploration(bitset.decode(d["visible"]), bitset.decode(d["visited"]), w.mark_dirty)
+        # Older saves don't say which generator built them; adopt the current one if it reproduces the terrain
+        if w.generator is None and w.seed and w.matches_generator(): w.generator = GENERATOR_VERSION
+        return w
+    def matches_generator(self):
+        s = static_layer(self.seed, self.level, GENERATOR_VERSION)
+        if s["radius"] != self.radius or tuple(s["exit_pos"]) != self.exit_pos: return False
+        names = [s["legend"][tid] for tid in s["type"]]
+        return [(t.q, t.r, t.type) for t in self.tiles.values()] == list(zip(s["q"], s["r"], names))
+    @property
+    def topology(self):
+        # Built on first use for the current tile set; generation and decoding replace self.tiles wholesale
+        if self._topology is None or self._topology.tiles is not self.tiles: self._topology = HexTopology(self.tiles)
+        return self._topology
+    def sight(self, pos, summit=False, disoriented=False):
+        """Bitset of the tile ids visible from pos (see fog.footprint), memoized per (pos, summit, sandstorm)."""
+        # Terrain only changes while a tile set is generated or decoded, and each new one gets a new topology
+        topo = self.topology
+        if self._sight_for is not topo: self._sight = collections.OrderedDict(); self._sight_for = topo
+        key = (pos, summit, disoriented); lit = self._sight.get(key)
+        if lit is None:
+            limit, blockers = fog.vision(self.tiles[pos].type, summit)
+            lit = self._sight[key] = bitset.from_indices(fog.footprint(topo, topo.ids[pos], limit, blockers, disoriented))
+            if len(self._sight) > SIGHT_CACHE_SIZE: self._sight.popitem(last=False)
+        else: self._sight.move_to_end(key)
+        return lit
+    def mark_dirty(self, bits):
+        """Bumps the render version of each chunk (chunks.chunk_of) holding a tile in `bits`."""
+        coords = self.topology.coords; versions = self.chunk_versions
+        for key in {chunk_of(coords[i]) for i in bitset.indices(bits)}: versions[key] = versions.get(key, 0) + 1
+    def mark_dirty_at(self, c):
+        # Per-tile state drawn on the map changed (trap owner, trap rings)
+        if c in self.tiles: key = chunk_of(c); self.chunk_versions[key] = self.chunk_versions.get(key, 0) + 1
+    def trim(self):
+        # Lets cold, unexplored chunks go; only call it while nobody holds Tiles
+        if isinstance(self.tiles, ChunkedTiles): self.tiles.trim(shown=self.explore.visible | self.explore.visited)
+    # Generation shuffles this list in place, so it stays a fresh list per call
+    def get_neighbors(self, q, r): return [(q+dq, r+dr) for dq, dr in HEX_DIRECTIONS]
+    def hex_dist(self, a, b): return hex_distance(a, b)
+    
+    def generate_world(self):
+        # Private streams: generation never touches the module RNG, so it is
+        # reentrant and can run on any thread (see WorldLoader)
+        if self.generator not in SUPPORTED_GENERATORS: raise ValueError(f"Unknown generator v{self.generator}")
+        self.rng = WorldRng(self.seed, self.generator)
+        self._phase_start = time.perf_counter()
+        # Both paths build identical worlds; NumPy only makes it faster
+        if fastgen.np is not None and fastgen.ENABLED: return fastgen.generate_world_numpy(self)
+        self.generate_world_python()
+
+    def phase(self, name):
+        # End of a generation phase: charge it the time since the previous one
+        if self.phase_times is None: return
+        now = time.perf_counter(); self.phase_times[name] = self.phase_times.get(name, 0.0) + now - self._phase_start; self._phase_start = now
+
+    def generate_world_python(self):
+        layout = self.rng.layout; variants = self.rng.variants; biomes = self.rng.biomes; features = self.rng.features
+        target_size = BASE_MAP_SIZE + (self.level * LEVEL_GROWTH)
+        self.tiles = {}; self.tiles[(0,0)] = Tile(0,0,variants.randint(0, 100))
+        current_layer = [(0,0)]
+        while len(self.tiles) < target_size:
+            next_layer = set()
+            for curr in current_layer:
+                for n in self.get_neighbors(*curr):
+                    if n not in self.tiles: next_layer.add(n)
+            if not next_layer: break
+            candidates = list(next_layer); layout.shuffle(candidates)
+            take_count = max(1, int(len(candidates) * 0.85)) if len(self.tiles) > 20 else len(candidates)
+            added = []
+            for i in range(min(take_count, target_size - len(self.tiles))):
+                c = candidates[i]; self.tiles[c] = Tile(c[0], c[1], variants.randint(0, 100)); added.append(c)
+            current_layer = added
+        self.phase("growth")
+
+        keys = list(self.tiles.keys())
+        for _ in range(3): 
+            new_tiles = {}
+            for c in keys:
+                for n in self.get_neighbors(*c):
+                    if n not in self.tiles and n not in new_tiles:
+                        neighbor_count = sum(1 for nn in self.get_neighbors(*n) if nn in self.tiles)
+                        if neighbor_count >= 4: new_tiles[n] = Tile(n[0], n[1], variants.randint(0, 100))
+            if not new_tiles: break
+            self.tiles.update(new_tiles); keys.extend(new_tiles.keys())
+        self.phase("smoothing")
+
+        # Distance from the origin, used by every placement pass below
+        self.origin_dist = origin_dist = {c: hex_distance((0, 0), c) for c in self.tiles}
+        self.radius = max(origin_dist.values()) + 1
+
+        rot = biomes.uniform(0, 2*math.pi)
+        for c, t in self.tiles.items():
+            dist = origin_dist[c]
+            if dist <= 3: t.type = biomes.choice(["plains", "plains", "hills"])
+            elif dist <= (self.radius * 0.4):
+                if biomes.random() > 0.94: t.type = "mountain"
+                else: t.type = biomes.choice(["hills", "plains", "forest"]) 
+            else:
+                angle = math.atan2(math.sqrt(3)/2*c[0] + math.sqrt(3)*c[1], 3/2*c[0]) + rot
+                if angle < 0: angle += 2*math.pi
+                sector = int((angle / (2*math.pi)) * 3) % 3
+                moisture = math.sin((c[0]) * 0.25) + math.cos((c[1]) * 0.25)
+                if dist > (self.radius * 0.55):
+                    if moisture > 0: t.type = biomes.choice(["tundra", "tundra", "wasteland"])
+                    else: t.type = biomes.choice(["volcanic", "wasteland", "mountain"])
+                else:
+                    if moisture > 0.8: t.type = "lake" 
+                    elif moisture > 0.2: t.type = biomes.choice(["swamp", "swamp", "swamp", "plains"])
+                    elif moisture < -0.5: t.type = biomes.choice(["dunes", "scrub", "dunes"])
+                    else: t.type = biomes.choice(["plains", "hills", "scrub", "mountain"])
+            t.cost = TERRAIN_CONFIG[t.type]["cost"]
+        self.phase("biomes")
+        
+        # --- RUIN GENERATION (Update) ---
+        # Very rare, middle distance (4-9), isolated
+        ruin_locs = HexBuckets(4)
+        for c, t in self.tiles.items():
+            dist = origin_dist[c]
+            
+            # 1. Distance Check: Middle Band
+            if 4 <= dist <= 9 and t.type not in ["lake", "mountain", "start", "exit"]:
+                # 2. Rarity Check: 1.5% chance (0.015)
+                if features.random() < 0.015: 
+                    
+                    # 3. Isolation Check: no other ruin within 4 (a bucket lookup, not a scan)
+                    if not ruin_locs.any_within(c):
+                        t.type = "ruins"
+                        t.cost = 0 # Studying is free (currency-wise)
+                        ruin_locs.add(c)
+
+        self.start_pos = (0,0); self.tiles[self.start_pos].type = "start"; self.tiles[self.start_pos].cost = 0
+        all_coords = list(self.tiles.keys())
+        hard_tiles = [c for c in all_coords if self.tiles[c].type in ["tundra", "wasteland", "volcanic"] and origin_dist[c] > self.radius * 0.6]
+        self.exit_pos = features.choice(hard_tiles) if hard_tiles else max(all_coords, key=origin_dist.get)
+        
+        self.tiles[self.exit_pos].type = "exit"
+        self.tiles[self.exit_pos].cost = 0
+        self.phase("ruins")
+        
+        self.generate_forest_clusters(); self.phase("forests")
+        self.generate_lakes(); self.phase("lakes")
+        self.generate_keys(); self.phase("keys")
+
+    def generate_forest_clusters(self):
+        dist = self.origin_dist; tiles = self.tiles; start = self.start_pos; exit_pos = self.exit_pos
+        pool = CandidatePool(c for c in tiles if dist[c] > 2 and c != start and c != exit_pos and tiles[c].type not in ["mountain", "volcanic", "tundra", "wasteland", "ruins"])
+        def paint(c): tiles[c].type = "forest"; tiles[c].cost = TERRAIN_CONFIG["forest"]["cost"]
+        grow_blobs(self.rng.features, pool, self.rng.features.randint(4, 7), (6, 12), 30, self.get_neighbors,
+                   lambda n: n in tiles and n != start and n != exit_pos and tiles[n].type in ["plains", "hills", "scrub"], paint)
+
+    def generate_lakes(self):
+        dist = self.origin_dist; tiles = self.tiles; start = self.start_pos; exit_pos = self.exit_pos
+        pool = CandidatePool(c for c in tiles if dist[c] < self.radius - 1 and c != start and c != exit_pos and tiles[c].type != "ruins")
+        def paint(c): tiles[c].type = "lake"; tiles[c].cost = 0
+        grow_blobs(self.rng.features, pool, self.rng.features.randint(3, 5), (4, 9), 20, self.get_neighbors,
+                   lambda n: n in tiles and n != start and n != exit_pos, paint)
+
+    def generate_keys(self):
+        candidates = []
+        min_dist_from_exit = self.radius * 0.55
+        
+        valid_coords = [c for c in self.tiles.keys() if c != self.start_pos and c != self.exit_pos and self.tiles[c].type not in ["wall", "lake", "ruins"]]
+        
+        for c in valid_coords:
+            if hex_distance(c, self.exit_pos) > min_dist_from_exit:
+                candidates.append(c)
+        
+        if not candidates: candidates = valid_coords 
+
+        key1 = self.rng.features.choice(candidates)
+        self.tiles[key1].type = "key"
+        self.tiles[key1].cost = 0
+        
+        candidates_for_2 = [c for c in candidates if c != key1 and hex_distance(c, key1) > (self.radius * 0.4)]
+        if not candidates_for_2: candidates_for_2 = [c for c in candidates if c != key1] 
+        
+        if candidates_for_2:
+            key2 = self.rng.features.choice(candidates_for_2)
+            self.tiles[key2].type = "key"
+            self.tiles[key2].cost = 0
+
+@functools.lru_cache(maxsize=None)
+def generator_hash(version=GENERATOR_VERSION):
+    """
+    Generator version plus a digest of the generation code and constants.
+    Keys the on-disk world cache, so cached terrain goes stale by itself when
+    generation changes, even if nobody remembered to bump the version.
+    """
+    parts = [str(version), str(BASE_MAP_SIZE), str(LEVEL_GROWTH), repr(sorted((k, v["cost"]) for k, v in TERRAIN_CONFIG.items()))]
+    for src in (Tile.__init__, WorldRng, WorldMap.generate_world, WorldMap.generate_world_python, WorldMap.generate_forest_clusters,
+                WorldMap.generate_lakes, WorldMap.generate_keys, fastgen, placement, topology):
+        try: parts.append(inspect.getsource(src))
+        except (OSError, TypeError): parts.append(getattr(src, "__qualname__", getattr(src, "__name__", "")))  # No source shipped
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:12]
+
+def build_layer(seed, level, gen=GENERATOR_VERSION):
+    """Freshly generated terrain columns, bypassing every cache."""
+    enc = WorldMap(0, level, seed=seed, generator=gen).columns()
+    return {k: enc[k] for k in STATIC_KEYS}
+
+@functools.lru_cache(maxsize=8)
+def static_layer(seed, level, gen=GENERATOR_VERSION):
+    """Generated terrain columns for (seed, level). Shared and read-only."""
+    gen_hash = generator_hash(gen)
+    layer = worldcache.load(seed, level, gen_hash)
+    if layer is None or any(k not in layer for k in STATIC_KEYS):
+        layer = build_layer(seed, level, gen)
+        worldcache.store(seed, level, gen_hash, layer)
+    # Tuples, since every caller (and every cache hit) shares this one object
+    return {k: tuple(layer[k]) if isinstance(layer[k], list) else layer[k] for k in STATIC_KEYS}
+
+@functools.lru_cache(maxsize=4)
+def static_index(seed, level, gen=GENERATOR_VERSION):
+    """(coords, {"q,r": tile index}) over static_layer(seed, level, gen). Shared and read-only."""
+    layer = static_layer(seed, level, gen)
+    coords = list(zip(layer["q"], layer["r"]))
+    return coords, {f"{q},{r}": i for i, (q, r) in enumerate(coords)}
+
+@functools.lru_cache(maxsize=4)
+def static_chunk_index(seed, level, gen=GENERATOR_VERSION):
+    """ChunkIndex over static_layer(seed, level, gen). Shared and read-only."""
+    return ChunkIndex(static_layer(seed, level, gen))
+
+def expand_seed_world(d):
+    if d.get("gen") not in SUPPORTED_GENERATORS:
+        raise ValueError(f"World {d.get('seed')} was generated by v{d.get('gen')}, this client supports {SUPPORTED_GENERATORS}")
+    full = dict(static_layer(d["seed"], d["level"], d["gen"])); full.update(d); full["format"] = WORLD_FORMAT_COLUMNS
+    return full
+
+class SavedWorld:
+    """
+    Index over an encoded world dict, for code that patches the save file
+    (review hooks, disk sync) without building a WorldMap.
+    """
+    def __init__(self, enc):
+        self.enc = enc
+        # Seed-only worlds keep their terrain in the (cached) generated layer
+        if enc.get("format") == WORLD_FORMAT_SEED:
+            # ...and so can share its coordinate index with every other review of the same world
+            self.static = static_layer(enc["seed"], enc["level"], enc["gen"])
+            self.coords, self._index = static_index(enc["seed"], enc["level"], enc["gen"])
+        else:
+            self.static = enc
+            self.coords = list(zip(enc["q"], enc["r"])); self._index = None
+        self.bits = {f: bitset.decode(enc[f]) for f in WORLD_FLAGS}
+        self.touched = set()  # Tile indices whose flags changed since construction
+
+    @classmethod
+    def of(cls, d):
+        w = d.get("world")
+        if not w: return None
+        if "format" not in w:
+            if "tiles" not in w: return None
+            # Upgrade legacy tile dicts in place; the next save writes the compact form
+            w = d["world"] = WorldMap.from_dict(w).to_dict()
+        elif w["format"] == WORLD_FORMAT_SEED and w.get("gen") not in SUPPORTED_GENERATORS: return None
+        return cls(w)
+
+    @property
+    def index(self):
+        if self._index is None: self._index = {f"{q},{r}": i for i, (q, r) in enumerate(self.coords)}
+        return self._index
+
+    def key(self, i): q, r = self.coords[i]; return f"{q},{r}"
+    def type_of(self, i): return self.static["legend"][self.static["type"][i]]
+    def find_types(self, *names):
+        legend = self.static["legend"]
+        wanted = {legend.index(n) for n in names if n in legend}
+        return [i for i, tid in enumerate(self.static["type"]) if tid in wanted]
+
+    def get(self, flag, i): return bool(self.bits[flag] >> i & 1)
+    def set(self, flag, i, on):
+        if self.get(flag, i) == bool(on): return
+        self.bits[flag] ^= 1 << i
+        self.touched.add(i)
+
+    def commit(self):
+        n = len(self.coords)
+        for f in WORLD_FLAGS: self.enc[f] = bitset.encode(self.bits[f], n)
@@ -0,0 +1,78 @@
+import os
+import threading
+from . import serializers
+
+# ==========================================
+# ON-DISK WORLD CACHE
+# ==========================================
+# Generated terrain layers (see world.static_layer), one file per
+# (seed, level, generator hash). The hash is part of the file name, so a
+# layer built by older generation code is never looked up again; it just
+# ages out under the size cap like any other cold entry. Reads touch the
+# file's mtime, which makes "oldest mtime" the least recently used entry.
+#
+# Off until configure() names a directory. Any entry that fails to load is
+# deleted and regenerated by the caller.
+
+ENTRY_SUFFIX = ".world"
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+settings = {"dir": None, "max_bytes": DEFAULT_MAX_BYTES}
+_evict_lock = threading.Lock()
+
+def configure(directory, max_bytes=DEFAULT_MAX_BYTES):
+    """directory=None or max_bytes <= 0 turns the disk cache off."""
+    settings["dir"] = directory if max_bytes and max_bytes > 0 else None
+    settings["max_bytes"] = max_bytes
+
+def entry_path(seed, level, gen_hash):
+    return os.path.join(settings["dir"], f"{seed}_{level}_{gen_hash}{ENTRY_SUFFIX}")
+
+def _discard(path):
+    try: os.remove(path)
+    except OSError: pass
+
+def load(seed, level, gen_hash):
+    if not settings["dir"]: return None
+    path = entry_path(seed, level, gen_hash)
+    try:
+        with open(path, "rb") as f: entry = serializers.loads(f.read())
+    except FileNotFoundError: return None
+    except Exception: _discard(path); return None  # Truncated or written by a codec we no longer have
+    if not isinstance(entry, dict) or entry.get("key") != [seed, level, gen_hash]: _discard(path); return None
+    try: os.utime(path)
+    except OSError: pass
+    return entry["layer"]
+
+def store(seed, level, gen_hash, layer):
+    directory = settings["dir"]
+    if not directory: return
+    path = entry_path(seed, level, gen_hash)
+    # Per-thread temp name: background generation may store while the UI thread does
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp, "wb") as f: f.write(serializers.dumps({"key": [seed, level, gen_hash], "layer": layer}, compress=True))
+        os.replace(tmp, path)
+    except OSError as e:
+        _discard(tmp); print(f"Realm: could not cache world {seed}: {e}"); return
+    evict()
+
+def evict():
+    """Deletes least recently used entries until the directory fits max_bytes."""
+    directory = settings["dir"]
+    if not directory: return
+    with _evict_lock:
+        entries = []
+        try: names = os.listdir(directory)
+        except OSError: return
+        for name in names:
+            if not name.endswith(ENTRY_SUFFIX): continue
+            path = os.path.join(directory, name)
+            try: st = os.stat(path)
+            except OSError: continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+        total = sum(e[1] for e in entries)
+        for _, size, path in sorted(entries):
+            if total <= settings["max_bytes"]: break
+            _discard(path); total -= size
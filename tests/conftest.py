@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The realm package is Qt-free; import it without the add-on's __init__ (which needs Anki)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,9 @@
+from realm import bitset, fog
+
+def test_sandstorm_never_hides_kept_tiles():
+    mem = fog.blind({}, 100, (0, 42))
+    assert fog.hidden(mem) == bitset.from_indices(i for i in range(100) if i not in (0, 42))
+    assert fog.remaining(mem) == 98
+
+    mem = fog.restore(mem, 50); assert fog.is_blind(mem) and bitset.count(fog.hidden(mem)) == 48
+    mem = fog.restore(mem, 48); assert mem == {"epoch": 1} and fog.hidden(mem) == 0
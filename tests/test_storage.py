@@ -0,0 +1,47 @@
+import os
+
+from realm import bitset, storage
+from realm.world import WorldMap
+
+def save_with(visited, currency=0):
+    w = WorldMap(0, 1, seed=424242); w.explore.reveal(bitset.from_indices(visited))
+    return {"uid": "u", "currency": currency, "world": w.to_dict()}
+
+def visited(data): return list(bitset.indices(bitset.decode(data["world"]["visited"])))
+
+def test_crash_between_replace_and_journal_remove(tmp_path, monkeypatch):
+    path = str(tmp_path / "save.json"); store = storage.JournalStore(path)
+    store.save(save_with([])); store.flush()
+    store.save(save_with([1, 2, 3])); store.flush()
+    assert os.path.exists(store.journal_path)
+
+    # Next write compacts; die after the new base is in place but before the old journal goes
+    def crash(p): raise OSError("killed")
+    monkeypatch.setattr(storage, "JOURNAL_COMPACT_BYTES", 0); monkeypatch.setattr(os, "remove", crash)
+    store.save(save_with([1, 2, 3], currency=7)); store.flush()
+    monkeypatch.undo()
+    assert os.path.exists(store.journal_path)
+
+    data = storage.JournalStore(path).load()
+    assert visited(data) == [1, 2, 3] and data["currency"] == 7
+
+def test_torn_journal_tail_is_dropped(tmp_path):
+    path = str(tmp_path / "save.json"); store = storage.JournalStore(path)
+    store.save({"uid": "u", "currency": 1}); store.flush()
+    store.save({"uid": "u", "currency": 5}); store.flush()
+    with open(store.journal_path, "a", encoding="utf-8") as f: f.write('{"set":{"curr')
+
+    store = storage.JournalStore(path); data = store.load(); assert data["currency"] == 5
+    data["currency"] = 99; store.save(data); store.flush()
+    assert storage.JournalStore(path).load()["currency"] == 99
+
+def test_torn_tail_after_non_ascii_deltas(tmp_path):
+    path = str(tmp_path / "save.json"); store = storage.JournalStore(path)
+    store.save({"uid": "u", "username": "Explorer"}); store.flush()
+    store.save({"uid": "u", "username": "Ünïcødé 探検家"}); store.flush()
+    assert store.journal_bytes == os.path.getsize(store.journal_path)
+    with open(store.journal_path, "a", encoding="utf-8") as f: f.write('{"set":{"user')
+
+    store = storage.JournalStore(path); data = store.load(); assert data["username"] == "Ünïcødé 探検家"
+    data["username"] = "Åländ"; store.save(data); store.flush()
+    assert storage.JournalStore(path).load()["username"] == "Åländ"
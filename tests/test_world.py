@@ -0,0 +1,12 @@
+from realm import bitset
+from realm.world import Tile, WorldMap
+
+def test_sight_is_memoized_per_tile_set():
+    w = WorldMap(0, 3, seed=424242); start = w.start_pos
+    lit = w.sight(start)
+    assert w.sight(start) is lit and bitset.count(lit) == 1 + 6 + 12
+
+    # New terrain arrives as a new tile set (generation, decoding): the memo must not survive it
+    tiles = {c: Tile(c[0], c[1], t.variant, t.type) for c, t in w.tiles.items()}
+    tiles[start].type = "forest"; w.tiles = tiles
+    assert bitset.count(w.sight(start)) == 1 + 6